@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class ApiConfig(AppConfig):
     name = 'api'
     verbose_name = 'API'
+
+    def ready(self):
+        from api.authentication import clear_auth_cache, user_changed
+
+        post_migrate.connect(clear_auth_cache)
+        post_save.connect(user_changed, sender=get_user_model())
+        post_delete.connect(user_changed, sender=get_user_model())
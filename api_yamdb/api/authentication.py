@@ -0,0 +1,147 @@
+"""Аутентификация по JWT без запроса пользователя к базе.
+
+Проверенные токены и проекция пользователя (id, username, role, is_staff,
+is_active) хранятся в ограниченных кешах LRU со временем жизни
+`AUTH_CACHE['TTL']` и `AUTH_CACHE['USER_TTL']`. Из проекции для каждого
+запроса создается свежий экземпляр `User` с отложенными остальными
+полями: права проверяются без запросов, а обращение к другим полям
+загружает их из базы.
+
+Кеши принадлежат процессу. Сохранение и удаление пользователя (API,
+админка, shell) сбрасывает его запись обработчиками post_save и
+post_delete, но только в том процессе, где они выполнены. Изменения в
+других процессах и в обход сигналов (`update`, `bulk_update`) видны по
+истечении USER_TTL, поэтому он короче времени жизни токенов.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.metrics import record_cache
+
+USER_FIELDS = ('id', 'username', 'role', 'is_staff', 'is_active')
+
+
+class LRUCache:
+    """Потокобезопасный кеш LRU с ограниченным размером и временем жизни."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Сохраняет значение; ttl может только сократить время жизни."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + ttl)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = LRUCache(
+    settings.AUTH_CACHE['MAX_SIZE'], settings.AUTH_CACHE['TTL']
+)
+user_cache = LRUCache(
+    settings.AUTH_CACHE['MAX_SIZE'], settings.AUTH_CACHE['USER_TTL']
+)
+
+
+def invalidate_user(user_id):
+    """Сбрасывает проекцию пользователя после изменения или удаления."""
+    user_cache.delete(user_id)
+
+
+def user_changed(sender, instance, **kwargs):
+    """Обработчик post_save и post_delete модели пользователя."""
+    invalidate_user(instance.pk)
+
+
+def clear_auth_cache(**kwargs):
+    """Очищает кеши; обработчик post_migrate (в том числе после flush)."""
+    token_cache.clear()
+    user_cache.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication с кешем проверенных токенов и пользователей."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # from_db ожидает значения в порядке полей модели.
+        self.user_fields = tuple(
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in USER_FIELDS
+        )
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        record_cache('jwt_tokens', token is not None)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            # Токен не должен пережить в кеше свой срок действия.
+            token_cache.set(raw_token, token, token['exp'] - time.time())
+        return token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Проверка отзыва требует хеша пароля, которого нет в проекции.
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+
+        values = user_cache.get(user_id)
+        record_cache('jwt_users', values is not None)
+        if values is None:
+            try:
+                values = self.user_model.objects.values_list(
+                    *self.user_fields
+                ).get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(
+                    _('User not found'), code='user_not_found'
+                )
+            user_cache.set(user_id, values)
+
+        user = self.user_model.from_db(
+            DEFAULT_DB_ALIAS, self.user_fields, values
+        )
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        return user
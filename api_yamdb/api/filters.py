@@ -1,24 +1,75 @@
 import django_filters
+from django.db.models import Count, Exists, OuterRef
 
-from reviews.models import Title
+from reviews.models import GenreTitle, Title
+from reviews.search import search_titles
+
+GENRE_MATCH_ANY = 'any'
+GENRE_MATCH_ALL = 'all'
+GENRE_MATCH_CHOICES = (
+    (GENRE_MATCH_ANY, GENRE_MATCH_ANY),
+    (GENRE_MATCH_ALL, GENRE_MATCH_ALL),
+)
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Фильтр по списку значений через запятую."""
 
 
 class TitleFilter(django_filters.FilterSet):
-    """Фильтр произведений по полям."""
+    """Фильтр произведений по полям.
 
-    category = django_filters.CharFilter(
+    `category` и `genre` сравнивают слаги точно и принимают несколько
+    значений через запятую; `genre_match=all` требует все перечисленные
+    жанры. Поиск по подстроке слага доступен в `category_contains` и
+    `genre_contains`.
+    """
+
+    category = CharInFilter(field_name='category__slug', lookup_expr='in')
+    category_contains = django_filters.CharFilter(
         field_name='category__slug',
         lookup_expr='icontains'
     )
-    genre = django_filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
+    genre = CharInFilter(method='filter_genre')
+    genre_match = django_filters.ChoiceFilter(
+        choices=GENRE_MATCH_CHOICES,
+        method='filter_genre_match'
     )
+    genre_contains = django_filters.CharFilter(method='filter_genre_contains')
     name = django_filters.CharFilter(
         field_name='name',
         lookup_expr='icontains'
     )
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('category', 'genre', 'year', 'name')
+        fields = ('category', 'genre', 'year', 'name', 'search')
+
+    def filter_genre(self, queryset, name, value):
+        """Отбирает произведения с любым или со всеми указанными жанрами.
+
+        Связи проверяются подзапросом, поэтому произведения не дублируются.
+        """
+        slugs = set(value)
+        links = GenreTitle.objects.filter(genre__slug__in=slugs)
+        if self.form.cleaned_data.get('genre_match') == GENRE_MATCH_ALL:
+            return queryset.filter(pk__in=links.order_by().values(
+                'title'
+            ).annotate(
+                genres=Count('genre', distinct=True)
+            ).filter(genres=len(slugs)).values('title'))
+        return queryset.filter(Exists(links.filter(title=OuterRef('pk'))))
+
+    def filter_genre_match(self, queryset, name, value):
+        """Режим сравнения жанров учитывается в `filter_genre`."""
+        return queryset
+
+    def filter_genre_contains(self, queryset, name, value):
+        return queryset.filter(Exists(GenreTitle.objects.filter(
+            title=OuterRef('pk'), genre__slug__icontains=value
+        )))
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию."""
+        return search_titles(queryset, value)
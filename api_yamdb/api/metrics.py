@@ -0,0 +1,50 @@
+"""Сбор метрик запросов к API для эндпоинта /metrics."""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from reviews.metrics import observe_request
+
+
+class QueryCounter:
+    """Обертка выполнения SQL, считающая запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Время, статус и число SQL-запросов по имени маршрута.
+
+    Маршрут — имя URL (`titles-list`, `reviews-detail`), а не путь, чтобы
+    число меток не росло с числом объектов.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(counter)
+                )
+            response = self.get_response(request)
+        match = request.resolver_match
+        observe_request(
+            match.url_name if match and match.url_name else 'unmatched',
+            request.method, response.status_code,
+            time.perf_counter() - started, counter.count,
+        )
+        return response
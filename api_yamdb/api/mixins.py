@@ -1,9 +1,33 @@
+from django.http import Http404
 from rest_framework import filters, mixins, viewsets
+from rest_framework.permissions import SAFE_METHODS
 
 from api.permissions import IsAdminOrReadOnly
+from api.replication import user_pinned
+from reviews.replication import current_routing
 
 
-class CreateListDestroyViewSet(mixins.CreateModelMixin,
+class ReplicaReadMixin:
+    """Безопасные запросы читают данные с реплики базы.
+
+    Реплика выбирается после аутентификации и проверки прав: пользователь
+    читается с основной базы, поэтому только что выданный токен работает
+    до обновления реплик. Пользователь, недавно писавший в базу, читает
+    с основной базы и без cookie закрепления.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        routing = current_routing.get()
+        if routing is None or request.method not in SAFE_METHODS:
+            return
+        if request.user.is_authenticated and user_pinned(request.user.pk):
+            routing.pinned = True
+        routing.use_replica()
+
+
+class CreateListDestroyViewSet(ReplicaReadMixin,
+                               mixins.CreateModelMixin,
                                mixins.ListModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
@@ -13,3 +37,32 @@ class CreateListDestroyViewSet(mixins.CreateModelMixin,
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+
+
+class NestedViewSetMixin:
+    """Проверяет родительский объект, только если выборка оказалась пустой.
+
+    Дочерние записи выбираются одним запросом по `*_id` из URL, а запрос
+    существования родителя выполняется лишь для пустой страницы.
+    Родитель задается моделью `parent_model` и словарем `parent_lookups`:
+    поле родителя -> именованный аргумент URL.
+    """
+
+    parent_model = None
+    parent_lookups = {}
+
+    def get_parent_queryset(self):
+        return self.parent_model.objects.filter(**{
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.parent_lookups.items()
+        })
+
+    def check_parent(self):
+        if not self.get_parent_queryset().exists():
+            raise Http404
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and not page:
+            self.check_parent()
+        return page
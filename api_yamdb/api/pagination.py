@@ -0,0 +1,110 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PubDateKeysetPagination(LimitOffsetPagination):
+    """Пагинация отзывов и комментариев по ключу (pub_date, id).
+
+    С параметром `cursor` (пустой — первая страница) страница выбирается
+    условием по ключу последней/первой записи, без OFFSET и COUNT(*).
+    Избыточное условие на pub_date дает SQLite начать поиск по индексу
+    сразу с позиции курсора.
+    Без него работает прежняя пагинация `limit`/`offset`.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_limit(request) or self.default_limit
+        reverse, position = self.decode_cursor(request)
+
+        if position is None:
+            page = queryset.order_by('-pub_date', '-id')
+        elif reverse:
+            pub_date, pk = position
+            page = queryset.filter(pub_date__gte=pub_date).filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+            ).order_by('pub_date', 'id')
+        else:
+            pub_date, pk = position
+            page = queryset.filter(pub_date__lte=pub_date).filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            ).order_by('-pub_date', '-id')
+
+        results = list(page[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return replace_query_param(
+                self.base_url, self.cursor_query_param, ''
+            )
+        return self.encode_cursor(True, self.page[0])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            pub_date = parse_datetime(tokens['d'][0])
+            pk = int(tokens['i'][0])
+        except (TypeError, ValueError, KeyError, IndexError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, (pub_date, pk)
+
+    def encode_cursor(self, reverse, instance):
+        tokens = {'d': instance.pub_date.isoformat(), 'i': instance.pk}
+        if reverse:
+            tokens['r'] = '1'
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        url = remove_query_param(self.base_url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
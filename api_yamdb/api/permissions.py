@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -8,6 +9,15 @@ class IsAdmin(permissions.BasePermission):
         return request.user.is_authenticated and (request.user.is_admin)
 
 
+class IsLocalRequest(permissions.BasePermission):
+    """Разрешает доступ только с адресов из METRICS['ALLOWED_IPS']."""
+
+    def has_permission(self, request, view):
+        return (
+            request.META.get('REMOTE_ADDR') in settings.METRICS['ALLOWED_IPS']
+        )
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     """Разрешает изменять данные только администратору."""
 
@@ -18,9 +28,13 @@ class IsAdminOrReadOnly(permissions.BasePermission):
 
 
 class IsAuthorModeratorAdminOrReadOnly(permissions.IsAuthenticatedOrReadOnly):
-    """Разрешает изменения только авторам, модераторам и администраторам."""
+    """Разрешает изменения только авторам, модераторам и администраторам.
+
+    Автор сравнивается по `author_id`, а роль берется из проекции
+    пользователя, поэтому проверка не обращается к базе.
+    """
 
     def has_object_permission(self, request, view, obj):
         return (request.method in permissions.SAFE_METHODS
-                or (request.user.is_admin or request.user.is_moderator)
-                or obj.author == request.user)
+                or obj.author_id == request.user.pk
+                or request.user.is_admin or request.user.is_moderator)
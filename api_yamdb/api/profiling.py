@@ -0,0 +1,183 @@
+"""Профилирование запросов к API.
+
+`ProfilingMiddleware` включается настройкой `PROFILING['ENABLED']` и для
+каждого запроса считает число и время SQL-запросов, время сериализаторов,
+проверок прав и отрисовки ответа, а также время представления и всего
+запроса. Результаты отдаются в заголовке `Server-Timing`; запросы дольше
+`PROFILING['SLOW_REQUEST_MS']` попадают в журнал вместе с самыми долгими
+SQL-запросами. Выключенное профилирование исключает промежуточный слой из
+цепочки и не добавляет накладных расходов.
+"""
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar('current_profile', default=None)
+
+PROFILED_SECTIONS = (
+    ('serializer', (
+        serializers.BaseSerializer, serializers.Serializer,
+        serializers.ListSerializer,
+    ), ('is_valid', 'save', 'data')),
+    ('permissions', (APIView,), (
+        'check_permissions', 'check_object_permissions',
+    )),
+    ('render', (Response,), ('rendered_content',)),
+)
+
+
+class RequestProfile:
+    """Замеры одного запроса; вызывается как обертка выполнения SQL."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = []
+        self.sql_time = 0.0
+        self.sections = dict.fromkeys(
+            name for name, *_ in PROFILED_SECTIONS
+        )
+        self.active_section = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql_time += duration
+            self.queries.append((duration, sql))
+
+    def timings(self, finished):
+        """Пары (метрика, мс) для заголовка Server-Timing."""
+        timings = [('db', self.sql_time * 1000)]
+        timings.extend(
+            (name, duration * 1000)
+            for name, duration in self.sections.items()
+            if duration is not None
+        )
+        if self.view_started is not None:
+            timings.append(
+                ('view', (finished - self.view_started) * 1000)
+            )
+        timings.append(('total', (finished - self.started) * 1000))
+        return timings
+
+    def slowest_queries(self, count):
+        return heapq.nlargest(count, self.queries, key=lambda query: query[0])
+
+
+def profiled(section, method):
+    """Добавляет время метода к разделу профиля текущего запроса.
+
+    Время SQL-запросов внутри метода из раздела вычитается: оно уже
+    учтено в `db`. Вложенные вызовы относятся к внешнему разделу.
+    """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None or profile.active_section is not None:
+            return method(*args, **kwargs)
+        profile.active_section = section
+        started, sql_time = time.perf_counter(), profile.sql_time
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profile.active_section = None
+            profile.sections[section] = (profile.sections[section] or 0) + (
+                time.perf_counter() - started
+                - (profile.sql_time - sql_time)
+            )
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def install_section_timers():
+    """Один раз оборачивает методы DRF из PROFILED_SECTIONS."""
+    for section, classes, names in PROFILED_SECTIONS:
+        for cls in classes:
+            for name in names:
+                attribute = cls.__dict__.get(name)
+                if isinstance(attribute, property):
+                    if getattr(attribute.fget, 'profiled', False):
+                        continue
+                    setattr(cls, name, property(
+                        profiled(section, attribute.fget)
+                    ))
+                elif callable(attribute) and not getattr(
+                    attribute, 'profiled', False
+                ):
+                    setattr(cls, name, profiled(section, attribute))
+
+
+def server_timing(timings, query_count):
+    return ', '.join(
+        f'{name};dur={duration:.2f}'
+        + (f';desc="{query_count} SQL"' if name == 'db' else '')
+        for name, duration in timings
+    )
+
+
+class ProfilingMiddleware:
+    """Заголовок Server-Timing и журнал медленных запросов."""
+
+    def __init__(self, get_response):
+        options = settings.PROFILING
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = options['SLOW_REQUEST_MS']
+        self.slowest_queries = options['SLOWEST_QUERIES']
+        install_section_timers()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(profile)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        timings = profile.timings(time.perf_counter())
+        response['Server-Timing'] = server_timing(
+            timings, len(profile.queries)
+        )
+        total = timings[-1][1]
+        if self.slow_request_ms is not None and total >= self.slow_request_ms:
+            self.log_slow_request(request, response, profile, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def log_slow_request(self, request, response, profile, timings):
+        lines = [
+            f'{duration * 1000:8.2f} мс  {sql}'
+            for duration, sql in profile.slowest_queries(self.slowest_queries)
+        ]
+        logger.warning(
+            'Медленный запрос %s %s (%s): %s; SQL: %d\n%s',
+            request.method, request.get_full_path(), response.status_code,
+            ', '.join(f'{name} {duration:.1f} мс'
+                      for name, duration in timings),
+            len(profile.queries), '\n'.join(lines),
+        )
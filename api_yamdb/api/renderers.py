@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+
+from rest_framework import renderers
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Объекты JSON по одному на строку.
+
+    Потоковые выгрузки формируют ответ сами; рендерер нужен для выбора
+    формата и для ответов с ошибками.
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(
+            json.dumps(item, ensure_ascii=False) + '\n' for item in items
+        ).encode(self.charset)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """Словарь или список словарей в виде таблицы CSV с заголовком."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(items[0]),
+                                lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(items)
+        return output.getvalue().encode(self.charset)
+
+
+class PrometheusRenderer(renderers.BaseRenderer):
+    """Метрики в текстовом формате Prometheus; ошибки — текстом detail."""
+
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = f'{data.get("detail", "")}\n'
+        return (data or '').encode(self.charset)
@@ -0,0 +1,56 @@
+"""Закрепление клиентов за основной базой после записи."""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+from reviews.replication import Routing, current_routing
+
+PIN_COOKIE = 'primary_db'
+PIN_CACHE_KEY = 'primary_db:{}'
+
+
+def pin_user(user_id):
+    """Закрепляет пользователя за основной базой на PIN_SECONDS."""
+    cache.set(
+        PIN_CACHE_KEY.format(user_id), True,
+        settings.REPLICATION['PIN_SECONDS'],
+    )
+
+
+def user_pinned(user_id):
+    return cache.get(PIN_CACHE_KEY.format(user_id), False)
+
+
+class ReplicaPinMiddleware:
+    """Чтение своих записей при работе с репликами.
+
+    Запрос, записавший в базу, ставит клиенту cookie на
+    `REPLICATION['PIN_SECONDS']` секунд; пока она есть, клиент читает с
+    основной базы. Клиенты API с токеном часто не хранят cookie, поэтому
+    аутентифицированный пользователь закрепляется и на сервере — в кеше
+    Django (см. ReplicaReadMixin). Без настроенных реплик слой
+    исключается из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICATION['REPLICAS']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = Routing(pinned=PIN_COOKIE in request.COOKIES)
+        token = current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if routing.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICATION['PIN_SECONDS'],
+                httponly=True, samesite='Lax',
+            )
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_user(user.pk)
+        return response
@@ -1,11 +1,15 @@
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.validators import UnicodeUsernameValidator
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 
+from api.fields import BulkSlugRelatedField
 from reviews.constants import MAX_LENGTH_EMAIL, MAX_LENGTH_USERNAME
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
 from reviews.validators import validate_username
 
 
@@ -84,7 +88,7 @@ class GetTitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('score_sum', 'score_count')
 
 
 class PostTitleSerializer(serializers.ModelSerializer):
@@ -92,14 +96,25 @@ class PostTitleSerializer(serializers.ModelSerializer):
 
     category = serializers.SlugRelatedField(slug_field='slug',
                                             queryset=Category.objects.all())
-    genre = serializers.SlugRelatedField(slug_field='slug', many=True,
-                                         allow_empty=False, allow_null=True,
-                                         required=True,
-                                         queryset=Genre.objects.all())
+    genre = BulkSlugRelatedField(slug_field='slug', many=True,
+                                 allow_empty=False, allow_null=True,
+                                 required=True,
+                                 queryset=Genre.objects.all())
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('score_sum', 'score_count')
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Создает произведение и связи с жанрами одной вставкой."""
+        genres = validated_data.pop('genre')
+        title = Title.objects.create(**validated_data)
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for genre in dict.fromkeys(genres)
+        )
+        return title
 
     def to_representation(self, title):
         "Метод для вывода результата запроса."
@@ -107,7 +122,18 @@ class PostTitleSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ChangedFieldsUpdateMixin:
+    """Записывает при изменении только переданные в запросе поля."""
+
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class ReviewSerializer(ChangedFieldsUpdateMixin,
+                       serializers.ModelSerializer):
     """Сериализатор для модели ревью."""
 
     author = serializers.SlugRelatedField(
@@ -126,19 +152,31 @@ class ReviewSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        """Запрещает пользователям оставлять повторные отзывы."""
+        """Запрещает пользователям оставлять повторные отзывы.
+
+        Существование произведения и наличие отзыва автора проверяются
+        одним запросом.
+        """
         if not self.context.get('request').method == 'POST':
             return data
         author = self.context.get('request').user
         title_id = self.context.get('view').kwargs.get('title_id')
-        if Review.objects.filter(author=author, title=title_id).exists():
+        reviewed = Title.objects.filter(pk=title_id).annotate(
+            reviewed=Exists(Review.objects.filter(
+                author=author, title=OuterRef('pk')
+            ))
+        ).values_list('reviewed', flat=True).first()
+        if reviewed is None:
+            raise Http404
+        if reviewed:
             raise serializers.ValidationError(
                 'Вы уже оставляли отзыв на это произведение',
             )
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ChangedFieldsUpdateMixin,
+                        serializers.ModelSerializer):
     """Сериализатор для модели комментария."""
 
     author = serializers.SlugRelatedField(
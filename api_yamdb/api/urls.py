@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, TitleViewSet, TokenValidationAPIView,
-                    UserListViewSet, UserRegisterAPIView)
+from .views import (CategoryViewSet, CommentViewSet, ExportAPIView,
+                    GenreViewSet, ReviewViewSet, TitleViewSet,
+                    TokenValidationAPIView, UserListViewSet,
+                    UserRegisterAPIView)
 
 router_01 = DefaultRouter()
 
@@ -25,6 +26,7 @@ auth_urls = [
 
 paths = [
     path('auth/', include(auth_urls)),
+    path('export/<str:dataset>/', ExportAPIView.as_view(), name='export'),
     path('', include(router_01.urls)),
 ]
 
@@ -1,27 +1,29 @@
 
-from django.conf import settings
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, views, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import AccessToken
 
 from api.filters import TitleFilter
-from api.mixins import CreateListDestroyViewSet
+from api.mixins import (CreateListDestroyViewSet, NestedViewSetMixin,
+                        ReplicaReadMixin)
+from api.pagination import PubDateKeysetPagination
 from api.permissions import (IsAdmin, IsAdminOrReadOnly,
-                             IsAuthorModeratorAdminOrReadOnly)
+                             IsAuthorModeratorAdminOrReadOnly, IsLocalRequest)
+from api.renderers import CSVRenderer, NDJSONRenderer, PrometheusRenderer
 from api.serializers import (CategorySerializer, CommentSerializer,
                              GenreSerializer, GetTitleSerializer,
                              PostTitleSerializer, ReviewSerializer,
                              TokenSerializer, UserRegistrationSerializer,
                              UserSerializer)
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.export import EXPORT_DATASETS, export_lines
+from reviews.metrics import registry
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.outbox import enqueue_email
 
 
 class UserRegisterAPIView(views.APIView):
@@ -43,15 +45,14 @@ class UserRegisterAPIView(views.APIView):
         )
 
     def generate_confirmation_code(self, user):
-        return default_token_generator.make_token(user)
+        return user.confirmation_code
 
     def send_confirmation_code(self, email, confirmation_code):
-        send_mail(
+        """Ставит письмо с кодом в очередь: его отправит send_emails."""
+        enqueue_email(
             subject='Confirmation Code',
             message=f'Your confirmation code: {confirmation_code}',
-            from_email=settings.EMAIL_SENDER,
-            recipient_list=[email],
-            fail_silently=False,
+            recipient=email,
         )
 
 
@@ -80,6 +81,10 @@ class UserListViewSet(viewsets.ModelViewSet):
     lookup_field = 'username'
     lookup_value_regex = r'[\w\@\.\+\-]+'
 
+    def get_current_user(self):
+        """Полная запись пользователя: request.user содержит лишь проекцию."""
+        return User.objects.get(pk=self.request.user.pk)
+
     @action(
         methods=['GET'],
         detail=False,
@@ -87,13 +92,13 @@ class UserListViewSet(viewsets.ModelViewSet):
         url_path='me'
     )
     def get_current_user_info(self, request):
-        serializer = self.get_serializer(request.user)
+        serializer = self.get_serializer(self.get_current_user())
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @get_current_user_info.mapping.patch
     def update_current_user_info(self, request):
         serializer = self.get_serializer(
-            request.user,
+            self.get_current_user(),
             data=request.data,
             partial=True
         )
@@ -116,11 +121,12 @@ class GenreViewSet(CreateListDestroyViewSet):
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Вьюсет для модели произведения."""
 
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('rating')
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('rating')
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = TitleFilter
@@ -133,41 +139,89 @@ class TitleViewSet(viewsets.ModelViewSet):
         return GetTitleSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, NestedViewSetMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для модели ревью."""
 
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthorModeratorAdminOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = PubDateKeysetPagination
     http_method_names = ('get', 'post', 'patch', 'delete')
-
-    def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        reviews = Review.objects.filter(title_id=self.kwargs.get('title_id'))
+        if self.request.method == 'DELETE':
+            # Удалению нужны автор для проверки прав и оценка для рейтинга.
+            return reviews.only('author', 'title', 'score')
+        return reviews.select_related('author').only(
+            'text', 'score', 'pub_date', 'title', 'author__username'
+        )
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user,
-                        title_id=self.get_title().id)
+                        title_id=self.kwargs.get('title_id'))
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ReplicaReadMixin, NestedViewSetMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет для модели коммента."""
 
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorModeratorAdminOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = PubDateKeysetPagination
     http_method_names = ('get', 'post', 'patch', 'delete')
-
-    def get_review(self):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        return get_object_or_404(Review, title_id=title_id, id=review_id)
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        comments = Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'),
+        )
+        if self.request.method == 'DELETE':
+            return comments.only('author')
+        return comments.select_related('author').only(
+            'text', 'pub_date', 'author__username'
+        )
 
     def perform_create(self, serializer):
+        self.check_parent()
         serializer.save(author=self.request.user,
-                        review_id=self.get_review().id)
+                        review_id=self.kwargs.get('review_id'))
+
+
+class ExportAPIView(views.APIView):
+    """Потоковая выгрузка набора данных для администраторов.
+
+    Формат выбирается заголовком Accept или параметром `format`
+    (ndjson по умолчанию, csv); строки формируются по мере чтения из базы.
+    """
+
+    permission_classes = (IsAuthenticated, IsAdmin)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    def get(self, request, dataset):
+        if dataset not in EXPORT_DATASETS:
+            raise Http404
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            export_lines(dataset, renderer.format),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{renderer.format}"'
+        )
+        return response
+
+
+class MetricsAPIView(views.APIView):
+    """Метрики всех процессов сервиса в формате Prometheus."""
+
+    authentication_classes = ()
+    permission_classes = (IsLocalRequest,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(registry.render())
@@ -30,6 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.replication.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +73,47 @@ DATABASES = {
     }
 }
 
+# Рабочий профиль SQLite (DATABASE_PROFILE=production): журнал WAL,
+# постоянные соединения, BEGIN IMMEDIATE и повтор запросов при блокировке.
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'development')
+
+SQLITE_TUNING = {
+    'ENABLED': DATABASE_PROFILE == 'production',
+    'PRAGMAS': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -32 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+    'LOCK_RETRIES': 5,
+    'LOCK_RETRY_DELAY': 0.05,
+}
+
+if SQLITE_TUNING['ENABLED']:
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+
+# Реплики для чтения (DATABASE_REPLICAS — пути к файлам SQLite через
+# запятую; их обновляет команда sync_replicas). Безопасные запросы к
+# каталогу, отзывам и комментариям читают с реплик, а клиент после записи
+# PIN_SECONDS секунд читает с основной базы.
+REPLICATION = {
+    'REPLICAS': [],
+    'PIN_SECONDS': 5,
+    'SYNC_INTERVAL': 1,
+}
+
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'], NAME=name, TEST={'MIRROR': 'default'}
+    )
+    REPLICATION['REPLICAS'].append(f'replica{number}')
+
+DATABASE_ROUTERS = ['reviews.replication.ReplicaRouter']
+
 
 # Password validation
 
@@ -112,7 +156,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -127,6 +171,16 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Кеш аутентификации в памяти процесса: проверенные токены хранятся не
+# дольше TTL секунд, проекция пользователя — не дольше USER_TTL. Изменения
+# пользователя, сделанные в других процессах или через update(), видны
+# по истечении USER_TTL.
+AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'USER_TTL': 5,
+}
+
 EMAIL_HOST = 'smtp.gmail.com'
 
 EMAIL_SENDER = 'noreply@example.com'
@@ -141,4 +195,44 @@ EMAIL_USE_TLS = True
 
 EMAIL_USE_SSL = False
 
+# Очередь исходящих писем: запросы сохраняют письма в базу, а команда
+# send_emails отправляет их пачками по BATCH_SIZE через одно соединение.
+# Неудачная отправка повторяется через RETRY_DELAY секунд, пауза удваивается
+# с каждой попыткой; после MAX_ATTEMPTS письмо помечается недоставленным.
+# Пачка, захваченная отправителем, недоступна другим LEASE секунд.
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'LEASE': 300,
+    'POLL_INTERVAL': 1,
+}
+
+# Профилирование запросов: заголовок Server-Timing и журнал запросов
+# дольше SLOW_REQUEST_MS (None — не записывать) с самыми долгими SQL.
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING', 'False') == 'True',
+    'SLOW_REQUEST_MS': 500,
+    'SLOWEST_QUERIES': 3,
+}
+
+# Журнал SQL-запросов дольше THRESHOLD_MS с планами EXPLAIN QUERY PLAN;
+# сводка по отпечаткам запросов — команда slow_queries.
+SLOW_QUERIES = {
+    'ENABLED': os.getenv('SLOW_QUERIES', 'False') == 'True',
+    'THRESHOLD_MS': 100,
+    'PATH': BASE_DIR / 'slow_queries.jsonl',
+    'EXPLAIN': True,
+}
+
+# Метрики Prometheus по адресу /metrics (сбор включается переменной
+# METRICS=True). Под сервером с несколькими процессами задайте общий
+# каталог MULTIPROCESS_DIR: процессы сохраняют в него свои значения, а
+# эндпоинт их суммирует.
+METRICS = {
+    'ENABLED': os.getenv('METRICS', 'False') == 'True',
+    'MULTIPROCESS_DIR': os.getenv('METRICS_MULTIPROCESS_DIR'),
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
 AUTH_USER_MODEL = 'reviews.User'
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, OutgoingEmail, Review,
+                            Title, User)
 
 
 @admin.register(Category)
@@ -39,6 +40,21 @@ class GenreAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipient',
+        'subject',
+        'created',
+        'next_attempt',
+        'attempts',
+        'failed',
+    )
+    search_fields = ('recipient',)
+    list_filter = ('failed',)
+    empty_value_display = '-пусто-'
+
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = (
@@ -93,3 +109,4 @@ class CustomUserAdmin(BaseUserAdmin):
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
         ('Confirmation', {'fields': ('confirmation_code',)}),
     )
+    readonly_fields = ('confirmation_code',)
@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def restore_title_search(sender, using, **kwargs):
+    from reviews.models import Title
+    from reviews.search import create_title_search
+
+    if router.allow_migrate_model(using, Title):
+        create_title_search(connections[using])
 
 
 class ReviewsConfig(AppConfig):
     name = 'reviews'
     verbose_name = 'Отзывы'
+
+    def ready(self):
+        post_migrate.connect(restore_title_search, sender=self)
+        if settings.SQLITE_TUNING['ENABLED']:
+            from reviews.database import configure_sqlite
+
+            connection_created.connect(configure_sqlite)
+        if settings.SLOW_QUERIES['ENABLED']:
+            from reviews.slow_queries import install_slow_query_log
+
+            connection_created.connect(install_slow_query_log)
@@ -1,6 +1,6 @@
 MAX_LENGTH_CATEGORY_GENRE = 256
-MAX_LENGTH_CONFIRMATION_CODE = 255
 MAX_LENGTH_EMAIL = 254
+MAX_LENGTH_EMAIL_SUBJECT = 255
 MAX_LENGTH_ROLE = 20
 MAX_LENGTH_TITLE = 256
 MAX_LENGTH_USERNAME = 150
@@ -0,0 +1,67 @@
+"""Настройка соединений SQLite для рабочего профиля базы.
+
+Обработчик `connection_created` включает журнал WAL (читатели не ждут
+писателя), задает PRAGMA из `SQLITE_TUNING['PRAGMAS']` и подключает
+`LockRetry`. Транзакции открываются через `BEGIN IMMEDIATE`: блокировка
+записи берется сразу и ожидается в пределах busy_timeout, а не
+запрашивается посреди транзакции, где SQLite отказывает без ожидания.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_locked(error):
+    return str(error).startswith(LOCKED_MESSAGES)
+
+
+class LockRetry:
+    """Обертка выполнения SQL, повторяющая запрос при блокировке базы.
+
+    Повторяются только запросы вне транзакции и начало транзакции: их
+    неудача ничего не изменила. Ошибка внутри транзакции передается
+    дальше — транзакцию целиком откатывает atomic. Паузы растут вдвое с
+    каждой попыткой, со случайным разбросом.
+    """
+
+    def __init__(self, retries, delay):
+        self.retries = retries
+        self.delay = delay
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        if sql == 'BEGIN':
+            sql = 'BEGIN IMMEDIATE'
+        attempt = 0
+        while True:
+            try:
+                return execute(sql, params, many, context)
+            except OperationalError as error:
+                if (attempt >= self.retries or connection.in_atomic_block
+                        or not is_locked(error)):
+                    raise
+            time.sleep(self.delay * 2 ** attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created для рабочего профиля SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    options = settings.SQLITE_TUNING
+    with connection.cursor() as cursor:
+        for pragma, value in options['PRAGMAS'].items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+    # Как и журнал медленных запросов, обертка ставится первой: соединение
+    # может открыться внутри execute_wrapper().
+    if not any(
+        isinstance(wrapper, LockRetry)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.insert(0, LockRetry(
+            options['LOCK_RETRIES'], options['LOCK_RETRY_DELAY']
+        ))
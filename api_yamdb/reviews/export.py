@@ -0,0 +1,109 @@
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import Category, Comment, Genre, GenreTitle, Review, Title, User
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# Наборы и столбцы совпадают с файлами csv_db: выгрузка в CSV загружается
+# обратно командой csv_db.
+EXPORT_DATASETS = {
+    'users': (User, ('id', 'username', 'email', 'role', 'bio',
+                     'first_name', 'last_name')),
+    'category': (Category, ('id', 'name', 'slug')),
+    'genre': (Genre, ('id', 'name', 'slug')),
+    'titles': (Title, ('id', 'name', 'year', 'category', 'description')),
+    'genre_title': (GenreTitle, ('id', 'title_id', 'genre_id')),
+    'review': (Review, ('id', 'title_id', 'text', 'author', 'score',
+                        'pub_date')),
+    'comments': (Comment, ('id', 'review_id', 'text', 'author',
+                           'pub_date')),
+}
+
+
+def export_rows(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Кортежи значений набора в порядке столбцов EXPORT_DATASETS.
+
+    Строки читаются итератором базы пачками по chunk_size, без загрузки
+    всей таблицы в память.
+    """
+    model, columns = EXPORT_DATASETS[dataset]
+    attnames = [model._meta.get_field(column).attname for column in columns]
+    return model.objects.order_by('pk').values_list(*attnames).iterator(
+        chunk_size=chunk_size
+    )
+
+
+def title_records(chunk_size=EXPORT_CHUNK_SIZE):
+    """Произведения со слагами жанров и категории и рейтингом.
+
+    Произведения выбираются пачками по возрастанию id, жанры каждой
+    пачки — одним дополнительным запросом.
+    """
+    titles = Title.objects.order_by('pk').values(
+        'id', 'name', 'year', 'description', 'rating',
+        category_slug=F('category__slug'),
+    )
+    last = 0
+    while True:
+        chunk = list(titles.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        last = chunk[-1]['id']
+        genres = {}
+        for title_id, slug in GenreTitle.objects.filter(
+            title_id__in=[title['id'] for title in chunk]
+        ).order_by('genre__slug').values_list('title_id', 'genre__slug'):
+            genres.setdefault(title_id, []).append(slug)
+        for title in chunk:
+            title['category'] = title.pop('category_slug')
+            title['genre'] = genres.get(title['id'], [])
+            yield title
+
+
+def export_records(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Словари для NDJSON; произведения дополняются жанрами и рейтингом."""
+    if dataset == 'titles':
+        return title_records(chunk_size)
+    _, columns = EXPORT_DATASETS[dataset]
+    return (
+        dict(zip(columns, row)) for row in export_rows(dataset, chunk_size)
+    )
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    """Строки CSV с заголовком; даты записываются в ISO 8601."""
+    writer = csv.writer(Echo(), lineterminator='\n')
+    encoder = DjangoJSONEncoder()
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([
+            encoder.default(value) if isinstance(value, datetime) else value
+            for value in row
+        ])
+
+
+def export_lines(dataset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки выгрузки набора в формате csv или ndjson."""
+    if export_format == 'csv':
+        yield from csv_lines(
+            EXPORT_DATASETS[dataset][1], export_rows(dataset, chunk_size)
+        )
+        return
+    for record in export_records(dataset, chunk_size):
+        yield json.dumps(
+            record, ensure_ascii=False, cls=DjangoJSONEncoder
+        ) + '\n'
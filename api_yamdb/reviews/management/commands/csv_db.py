@@ -1,13 +1,55 @@
 import csv
+import heapq
+import os
+import tempfile
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from hashlib import blake2b
+from itertools import chain, islice
 
-from django.core.management import BaseCommand
+import django
+from django.apps import apps
+from django.core.management import BaseCommand, CommandError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import (DEFAULT_DB_ALIAS, connection, connections,
+                       reset_queries, transaction)
 
+from reviews.metrics import record_csv_import
 from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
                             Title, User)
+from reviews.search import create_title_search, drop_title_search
 
 
 PATH_TO_CSV_FILES = 'static/data/'
 
+BATCH_SIZE = 5000
+
+BULK_LOAD_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': -256 * 1024,
+    'foreign_keys': 'OFF',
+}
+
+CHECK_SAMPLE_SIZE = 10
+
+ID_BITMAP_LIMIT = 2 ** 28
+
+KEY_CHUNK_SIZE = 1000000
+
+CHECK_LABELS = {
+    'invalid': 'некорректные значения',
+    'duplicate_id': 'повторяющиеся id',
+    'foreign_key': 'ссылки на несуществующие записи',
+    'unique': 'повторяющиеся сочетания уникальных полей',
+    'range': 'значения вне допустимого диапазона',
+}
+
 
 CSV_FILES_MODELS = [
     ['users.csv', User],
@@ -22,33 +64,1009 @@ CSV_FILES_MODELS = [
 
 PUL = ('title', 'category', 'author')
 
+PLAIN_CONVERTERS = {
+    'AutoField': int,
+    'BigAutoField': int,
+    'BigIntegerField': int,
+    'IntegerField': int,
+    'PositiveIntegerField': int,
+    'PositiveSmallIntegerField': int,
+    'SmallIntegerField': int,
+    'CharField': str,
+    'SlugField': str,
+    'TextField': str,
+}
+
 
 def key_add_id(key):
     return f'{key}_id' if key in PUL else key
 
 
-def value_converted_to_int(key, value):
+def value_converted_to_int(key, value, nullable=False):
+    """Приводит значение столбца к значению поля.
+
+    Ключи приводятся к int; пустое значение поля с null=True означает NULL
+    (так выгрузка записывает None).
+    """
+    if nullable and value == '':
+        return None
     return int(value) if key in PUL or 'id' in key else value
 
 
+def read_rows(path, model):
+    """Построчно читает файл .csv и приводит значения к полям модели."""
+    nullable = {
+        field.attname for field in model._meta.concrete_fields if field.null
+    }
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield {
+                key_add_id(key): value_converted_to_int(
+                    key, value, key_add_id(key) in nullable
+                )
+                for key, value in row.items()
+            }
+
+
+def normalize(field, value):
+    """Приводит значение из файла или из базы к общей строковой форме."""
+    value = field.to_python(value)
+    if value is None:
+        return '\x00'
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat()
+    return str(value)
+
+
+def row_hash(fields, values):
+    """Короткий хеш строки для сравнения файла с базой."""
+    data = '\x1f'.join(
+        normalize(field, value) for field, value in zip(fields, values)
+    )
+    return int.from_bytes(
+        blake2b(data.encode('utf-8'), digest_size=8).digest(), 'big'
+    )
+
+
+def compared_fields(model, attnames):
+    """Поля из заголовка файла, которые сравниваются и обновляются.
+
+    Первичный ключ служит для сопоставления и в сравнение не входит.
+    """
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return [
+        fields[attname] for attname in attnames
+        if not fields[attname].primary_key
+    ]
+
+
+def read_raw(path):
+    """Возвращает заголовок файла .csv и итератор его строк-списков."""
+    f = open(path, 'r', encoding='utf-8')
+    reader = csv.reader(f)
+    header = next(reader, [])
+
+    def rows():
+        with f:
+            yield from reader
+
+    return header, rows()
+
+
+def is_dynamic_default(field):
+    """Значение по умолчанию поля нужно вычислять для каждой строки."""
+    return (
+        getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+        or callable(field.default)
+    )
+
+
+class RowConverter:
+    """Готовит INSERT и кортежи значений для executemany.
+
+    Значения приводятся так же, как при bulk_create: поля с auto_now_add
+    (если auto_now_add=False) и поля, которых нет в файле, получают
+    значения по умолчанию модели, а пустое значение поля с null=True
+    записывается как NULL. Постоянные значения по умолчанию
+    вычисляются один раз, а вызываемые (timezone.now, auto_now_add) —
+    для каждой строки. Объект не обращается к базе и может работать в
+    отдельном процессе.
+    """
+
+    def __init__(self, model, header, auto_now_add=False):
+        # Прокси django.db.connection обходится дорого при вызове на значение.
+        self.db = connections[DEFAULT_DB_ALIAS]
+        fields = {
+            field.attname: field for field in model._meta.concrete_fields
+        }
+        attnames = [key_add_id(key) for key in header]
+        self.columns = [
+            (position, fields[attname])
+            for position, attname in enumerate(attnames)
+            if auto_now_add
+            or not getattr(fields[attname], 'auto_now_add', False)
+        ]
+        used = [field for _, field in self.columns]
+        self.prototype = prototype = model()
+        defaults = [
+            field for field in fields.values()
+            if field not in used
+            and not (field.primary_key and field.attname not in attnames)
+        ]
+        self.dynamic = [
+            field for field in defaults if is_dynamic_default(field)
+        ]
+        defaults = [
+            field for field in defaults if field not in self.dynamic
+        ] + self.dynamic
+        self.default_values = tuple(
+            field.get_db_prep_save(
+                field.pre_save(prototype, add=True), self.db
+            )
+            for field in defaults if field not in self.dynamic
+        )
+        columns = ', '.join(
+            self.db.ops.quote_name(field.column) for field in used + defaults
+        )
+        placeholders = ', '.join(['%s'] * (len(used) + len(defaults)))
+        table = self.db.ops.quote_name(model._meta.db_table)
+        self.sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+
+        self.converters = [
+            (position, self.converter(field))
+            for position, field in self.columns
+        ]
+
+    def converter(self, field):
+        """Функция приведения значения столбца к значению для базы.
+
+        Для обязательных целых и строковых полей хватает int и str, это
+        в несколько раз быстрее to_python с get_db_prep_save.
+        """
+        target = field.target_field if field.is_relation else field
+        fast = PLAIN_CONVERTERS.get(target.get_internal_type())
+        if fast is not None and not field.null:
+            return fast
+        db = self.db
+        if field.null:
+            return lambda value: None if value == '' else (
+                field.get_db_prep_save(field.to_python(value), db)
+            )
+        return lambda value: field.get_db_prep_save(field.to_python(value), db)
+
+    def dynamic_value(self, field):
+        if callable(field.default):
+            setattr(self.prototype, field.attname, field.get_default())
+        value = field.pre_save(self.prototype, add=True)
+        return field.get_db_prep_save(value, self.db)
+
+    def convert(self, values):
+        return tuple(
+            convert(values[position]) for position, convert in self.converters
+        ) + self.default_values + tuple(
+            self.dynamic_value(field) for field in self.dynamic
+        )
+
+
+def csv_dependencies():
+    """Граф зависимостей файлов: файл -> файлы, на которые он ссылается."""
+    files = {model: file for file, model in CSV_FILES_MODELS}
+    return {
+        file: {
+            files[field.related_model]
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in files
+            and field.related_model is not model
+        }
+        for file, model in CSV_FILES_MODELS
+    }
+
+
+_converters = {}
+
+
+def init_worker():
+    """Инициализирует Django в процессе, запущенном через spawn."""
+    if not apps.ready:
+        django.setup()
+
+
+def convert_batch(label, header, rows):
+    """Приводит пачку строк в процессе пула; конвертеры кешируются."""
+    key = (label, tuple(header))
+    if key not in _converters:
+        _converters[key] = RowConverter(
+            apps.get_model(label), header, auto_now_add=True
+        )
+    return [_converters[key].convert(row) for row in rows]
+
+
+def batches(iterable, size):
+    """Делит итератор на списки не длиннее size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class IdSet:
+    """Множество неотрицательных целых id в виде битовой карты.
+
+    Каждый id до ID_BITMAP_LIMIT занимает один бит, поэтому десятки
+    миллионов id помещаются в несколько мегабайт. Отрицательные и очень
+    большие значения хранятся в обычном множестве.
+    """
+
+    def __init__(self):
+        self.bitmap = bytearray()
+        self.overflow = set()
+
+    def add(self, value):
+        """Добавляет id; возвращает False, если он уже был."""
+        if not 0 <= value < ID_BITMAP_LIMIT:
+            if value in self.overflow:
+                return False
+            self.overflow.add(value)
+            return True
+        byte, bit = value >> 3, 1 << (value & 7)
+        if byte >= len(self.bitmap):
+            self.bitmap.extend(
+                bytes(max(byte + 1 - len(self.bitmap), len(self.bitmap)))
+            )
+        if self.bitmap[byte] & bit:
+            return False
+        self.bitmap[byte] |= bit
+        return True
+
+    def __contains__(self, value):
+        if not 0 <= value < ID_BITMAP_LIMIT:
+            return value in self.overflow
+        byte = value >> 3
+        return (byte < len(self.bitmap)
+                and bool(self.bitmap[byte] & 1 << (value & 7)))
+
+
+def read_keys(file, size=65536):
+    """Читает отсортированный кусок ключей из временного файла."""
+    while True:
+        block = array('Q')
+        try:
+            block.fromfile(file, size)
+        except EOFError:
+            yield from block
+            return
+        yield from block
+
+
+class DuplicateKeys:
+    """Поиск повторяющихся 64-битных ключей внешней сортировкой.
+
+    Ключи копятся в массиве по KEY_CHUNK_SIZE штук; заполненный массив
+    сортируется и сбрасывается во временный файл, а в конце куски
+    сливаются. Память ограничена одним куском при любом числе строк.
+    """
+
+    def __init__(self, chunk_size=KEY_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.keys = array('Q')
+        self.chunks = []
+
+    def add(self, key):
+        self.keys.append(key)
+        if len(self.keys) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        chunk = tempfile.TemporaryFile()
+        array('Q', sorted(self.keys)).tofile(chunk)
+        chunk.seek(0)
+        self.chunks.append(chunk)
+        self.keys = array('Q')
+
+    def duplicates(self):
+        """Возвращает повторяющиеся ключи по возрастанию, каждый один раз."""
+        if self.chunks and self.keys:
+            self.flush()
+        keys = (
+            heapq.merge(*map(read_keys, self.chunks)) if self.chunks
+            else sorted(self.keys)
+        )
+        previous = reported = None
+        try:
+            for key in keys:
+                if key == previous and key != reported:
+                    reported = key
+                    yield key
+                previous = key
+        finally:
+            for chunk in self.chunks:
+                chunk.close()
+
+
+def value_limits(field):
+    """Самые узкие границы MinValueValidator и MaxValueValidator поля.
+
+    К валидаторам модели IntegerField добавляет границы типа в базе.
+    """
+    lows = [validator.limit_value for validator in field.validators
+            if isinstance(validator, MinValueValidator)]
+    highs = [validator.limit_value for validator in field.validators
+             if isinstance(validator, MaxValueValidator)]
+    return max(lows, default=None), min(highs, default=None)
+
+
+class CsvChecker:
+    """Проверка файлов .csv перед загрузкой, без обращения к базе.
+
+    Файлы читаются по одному разу в порядке зависимостей, поэтому к
+    моменту проверки ссылок id связанных таблиц уже собраны. Находит
+    некорректные и повторяющиеся id, ссылки на отсутствующие строки,
+    значения вне границ валидаторов и повторы уникальных сочетаний
+    (например, второй отзыв автора на то же произведение). Для каждого
+    вида ошибок сохраняется не больше sample_size примеров.
+    """
+
+    def __init__(self, path, sample_size=CHECK_SAMPLE_SIZE):
+        self.path = path
+        self.sample_size = sample_size
+        self.ids = {}
+        self.errors = Counter()
+        self.samples = []
+
+    def error(self, kind, location, message):
+        self.errors[kind] += 1
+        if self.errors[kind] <= self.sample_size:
+            self.samples.append(f'{location}: {message}')
+
+    def check(self):
+        for file, model in CSV_FILES_MODELS:
+            self.check_file(file, model)
+        return self.errors
+
+    def columns(self, file, model, header):
+        """Позиции столбцов, которые нужно проверять, по видам проверок.
+
+        Столбец, которому нет поля модели, делает файл непригодным для
+        загрузки, поэтому проверка сразу завершается ошибкой.
+        """
+        fields = {
+            field.attname: field for field in model._meta.concrete_fields
+        }
+        positions = {
+            key_add_id(key): position for position, key in enumerate(header)
+        }
+        for key in header:
+            if key_add_id(key) not in fields:
+                raise CommandError(
+                    f'{file}: неизвестный столбец {key!r}, у модели '
+                    f'{model._meta.object_name} нет такого поля'
+                )
+        references, limits = [], []
+        for attname, position in positions.items():
+            field = fields[attname]
+            if field.primary_key:
+                continue
+            if field.is_relation and field.related_model in self.ids:
+                references.append(
+                    (position, attname, field.related_model, field.null)
+                )
+            elif value_limits(field) != (None, None):
+                limits.append(
+                    (position, attname, *value_limits(field), field.null)
+                )
+        unique = []
+        for constraint in model._meta.constraints:
+            attnames = [
+                model._meta.get_field(name).attname
+                for name in getattr(constraint, 'fields', ())
+            ]
+            if len(attnames) == 2 and set(attnames) <= set(positions):
+                unique.append(
+                    [(positions[attname], attname) for attname in attnames]
+                )
+        return (
+            positions.get(model._meta.pk.attname), references, limits, unique
+        )
+
+    def check_file(self, file, model):
+        ids = self.ids[model] = IdSet()
+        try:
+            f = open(os.path.join(self.path, file), encoding='utf-8')
+        except OSError as error:
+            self.error('invalid', file, error.strerror)
+            return
+        with f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            pk, references, limits, unique = self.columns(
+                file, model, header
+            )
+            pairs = [DuplicateKeys() for _ in unique]
+            for row in reader:
+                location = f'{file}:{reader.line_num}'
+                if pk is not None:
+                    self.check_pk(ids, row, pk, location)
+                self.check_references(row, references, location)
+                self.check_limits(row, limits, location)
+                for columns, keys in zip(unique, pairs):
+                    key = self.pair_key(row, columns, location)
+                    if key is not None:
+                        keys.add(key)
+        for columns, keys in zip(unique, pairs):
+            names = ', '.join(attname for _, attname in columns)
+            for key in keys.duplicates():
+                self.error('unique', file, (
+                    f'повторяется ({names}) = ({key >> 32}, '
+                    f'{key & 0xFFFFFFFF})'
+                ))
+
+    def to_int(self, row, position, attname, location, nullable=False):
+        """Целое значение столбца; None для ошибки и для NULL.
+
+        Пустое значение поля с null=True — это NULL, а не ошибка.
+        """
+        if nullable and position < len(row) and row[position] == '':
+            return None
+        try:
+            return int(row[position])
+        except (IndexError, ValueError):
+            value = row[position] if position < len(row) else ''
+            self.error('invalid', location, f'{attname}={value!r} не число')
+
+    def check_pk(self, ids, row, position, location):
+        value = self.to_int(row, position, 'id', location)
+        if value is not None and not ids.add(value):
+            self.error('duplicate_id', location, f'повторяется id={value}')
+
+    def check_references(self, row, references, location):
+        for position, attname, related_model, nullable in references:
+            value = self.to_int(row, position, attname, location, nullable)
+            if value is not None and value not in self.ids[related_model]:
+                self.error('foreign_key', location, (
+                    f'{attname}={value}: нет записи '
+                    f'{related_model._meta.verbose_name}'
+                ))
+
+    def check_limits(self, row, limits, location):
+        for position, attname, low, high, nullable in limits:
+            value = self.to_int(row, position, attname, location, nullable)
+            if value is None:
+                continue
+            if (low is not None and value < low
+                    or high is not None and value > high):
+                self.error('range', location, (
+                    f'{attname}={value} вне диапазона {low}..{high}'
+                ))
+
+    def pair_key(self, row, columns, location):
+        """Упаковывает пару целых значений в один 64-битный ключ.
+
+        Нечисловые значения пропускаются: о них уже сообщила проверка
+        ссылок или границ того же столбца.
+        """
+        (first, first_name), (second, second_name) = columns
+        try:
+            first, second = int(row[first]), int(row[second])
+        except (IndexError, ValueError):
+            return None
+        if not (0 <= first < 2 ** 32 and 0 <= second < 2 ** 32):
+            self.error('range', location, (
+                f'{first_name}={first}, {second_name}={second} '
+                'вне диапазона 0..4294967295'
+            ))
+            return None
+        return first << 32 | second
+
+
 class Command(BaseCommand):
     help = 'Загружает данные из файлов .csv'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=PATH_TO_CSV_FILES,
+            help='Каталог с файлами .csv.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Число строк в одной пачке bulk_create.',
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Не очищать таблицы, а добавить и обновить только '
+                 'изменившиеся строки.',
+        )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='С --upsert удалить строки, которых нет в файлах.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Число процессов для разбора строк; независимые файлы '
+                 'загружаются одновременно.',
+        )
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help='Полная перезагрузка SQLite без журнала и fsync, с '
+                 'перестроением индексов после загрузки.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить файлы, не изменяя базу.',
+        )
+        parser.add_argument(
+            '--skip-check',
+            action='store_true',
+            help='Загружать без предварительной проверки файлов.',
+        )
+
     def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['delete_missing'] and not options['upsert']:
+            raise CommandError('--delete-missing работает только с --upsert')
+
+        if options['check'] or not options['skip_check']:
+            self.check_files(options['path'])
+            if options['check']:
+                return
+
+        if options['upsert']:
+            if options['fast']:
+                raise CommandError('--fast несовместим с --upsert')
+            return self.upsert(options['path'], options['batch_size'],
+                               delete_missing=options['delete_missing'])
+
+        if not options['fast']:
+            return self.reload(options['path'], options['batch_size'],
+                               workers=options['workers'])
+
+        if connection.vendor != 'sqlite':
+            raise CommandError('--fast поддерживается только для SQLite')
+        started = time.monotonic()
+        with self.bulk_load_settings():
+            self.reload(options['path'], options['batch_size'], fast=True,
+                        workers=options['workers'])
+        self.stdout.write(f'Всего: {time.monotonic() - started:.2f} с')
+
+    def check_files(self, path):
+        """Проверяет файлы до очистки таблиц (см. CsvChecker).
+
+        При ошибках выводит примеры и прерывает команду, база остается
+        нетронутой.
+        """
+        self.stdout.write(self.style.NOTICE('Проверка файлов'))
+        started = time.monotonic()
+        checker = CsvChecker(path)
+        errors = checker.check()
+        for sample in checker.samples:
+            self.stderr.write(sample)
+        if errors:
+            raise CommandError('Файлы не загружены: ' + '; '.join(
+                f'{CHECK_LABELS[kind]}: {count}'
+                for kind, count in errors.items()
+            ))
+        self.stdout.write(
+            f'Файлы проверены за {time.monotonic() - started:.2f} с'
+        )
+
+    def reload(self, path, batch_size, fast=False, workers=0):
+        """Очищает таблицы и загружает файлы заново (см. replace_tables).
+
+        С workers строки разбираются в пуле процессов (см. load_parallel).
+        """
+        self.replace_tables(
+            lambda timings: self.load(path, batch_size, timings, fast,
+                                      workers),
+            fast,
+        )
+        self.stdout.write(self.style.SUCCESS('Импорт завершен'))
+
+    def replace_tables(self, load, fast):
+        """Выполняет load(timings), заменяющую данные таблиц.
+
+        Загрузка, проверка ссылок и пересчет рейтинга идут в одной
+        транзакции: при ошибке в любом файле база остается прежней. В
+        режиме fast вторичные индексы и полнотекстовый индекс произведений
+        удаляются на время загрузки и восстанавливаются и после ошибки,
+        затем выполняется ANALYZE.
+        """
+        timings = []
+        with ExitStack() as stack:
+            if fast:
+                stack.enter_context(self.deferred_title_search(timings))
+            with transaction.atomic():
+                load(timings)
+                if fast:
+                    self.check_foreign_keys()
+                started = time.monotonic()
+                Title.objects.rebuild_rating()
+                timings.append(
+                    ('рейтинг', None, time.monotonic() - started, 0)
+                )
+
+        if fast:
+            started = time.monotonic()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            timings.append(('ANALYZE', None, time.monotonic() - started, 0))
+            self.report_timings(timings)
 
+    def load(self, path, batch_size, timings, fast, workers):
         self.stdout.write(self.style.NOTICE('Очистка базы данных'))
 
-        for _, model in reversed(CSV_FILES_MODELS):
-            model.objects.all().delete()
+        self.clear_tables()
 
         self.stdout.write(self.style.NOTICE('Загрузка данных'))
 
+        if workers:
+            with ExitStack() as stack:
+                index_timings = {
+                    file: stack.enter_context(self.deferred_indexes(model))
+                    for file, model in CSV_FILES_MODELS if fast
+                }
+                loaded = self.load_parallel(path, batch_size, workers)
+            for file, _ in CSV_FILES_MODELS:
+                timings.append(
+                    (file, *loaded[file], index_timings.get(file, [0])[0])
+                )
+            return
         for file, model in CSV_FILES_MODELS:
-            with open(PATH_TO_CSV_FILES + file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                model.objects.bulk_create([model(
-                    **{key_add_id(key): value_converted_to_int(key, value)
-                       for key, value in row.items()}
-                ) for row in reader])
+            file_path = os.path.join(path, file)
+            if not fast:
+                self.load_file(file_path, model, batch_size)
+                continue
+            with self.deferred_indexes(model) as index_timing:
+                started = time.monotonic()
+                loaded = self.load_file(file_path, model, batch_size)
+                load_time = time.monotonic() - started
+            timings.append((file, loaded, load_time, index_timing[0]))
 
-        self.stdout.write(self.style.SUCCESS('Импорт завершен'))
+    @contextmanager
+    def deferred_title_search(self, timings):
+        """Удаляет полнотекстовый индекс произведений на время загрузки.
+
+        Индекс и триггеры создаются заново и после ошибки: транзакция
+        загрузки к этому моменту откачена, и поиск снова строится по
+        прежним произведениям.
+        """
+        drop_title_search(connection)
+        try:
+            yield
+        finally:
+            started = time.monotonic()
+            create_title_search(connection, rebuild=True)
+            timings.append(('поиск', None, 0, time.monotonic() - started))
+
+    def load_parallel(self, path, batch_size, workers):
+        """Загружает файлы с разбором строк в пуле процессов.
+
+        Файл начинает читаться, как только загружены все файлы, на которые
+        он ссылается, поэтому независимые таблицы (пользователи, категории,
+        жанры) идут одновременно. Пачки приводятся к значениям полей в
+        процессах пула, а пишет их в базу один основной поток. Число пачек
+        в работе ограничено, чтобы память не росла с размером файлов.
+        Возвращает {файл: (строк, секунд)}.
+        """
+        dependencies = csv_dependencies()
+        models = dict(CSV_FILES_MODELS)
+        active, pending, done = {}, {}, {}
+        max_pending = workers * 2
+
+        with ProcessPoolExecutor(workers, initializer=init_worker) as pool, \
+                transaction.atomic(), connection.cursor() as cursor:
+            while len(done) < len(models):
+                for file, model in CSV_FILES_MODELS:
+                    if (file not in done and file not in active
+                            and dependencies[file] <= set(done)):
+                        header, rows = read_raw(os.path.join(path, file))
+                        active[file] = {
+                            'header': header,
+                            'batches': batches(rows, batch_size),
+                            'sql': RowConverter(
+                                model, header, auto_now_add=True
+                            ).sql,
+                            'pending': 0,
+                            'loaded': 0,
+                            'started': time.monotonic(),
+                        }
+
+                readers = [
+                    file for file, state in active.items()
+                    if state['batches'] is not None
+                ]
+                while readers and len(pending) < max_pending:
+                    file = readers.pop(0)
+                    state = active[file]
+                    batch = next(state['batches'], None)
+                    if batch is None:
+                        state['batches'] = None
+                        continue
+                    future = pool.submit(
+                        convert_batch, models[file]._meta.label,
+                        state['header'], batch
+                    )
+                    pending[future] = file
+                    state['pending'] += 1
+                    readers.append(file)
+
+                if pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        state = active[pending.pop(future)]
+                        rows = future.result()
+                        cursor.executemany(state['sql'], rows)
+                        state['loaded'] += len(rows)
+                        state['pending'] -= 1
+                    reset_queries()
+
+                for file, state in list(active.items()):
+                    if state['batches'] is None and not state['pending']:
+                        del active[file]
+                        self.table_loaded(
+                            file, state['loaded'], state['started']
+                        )
+                        done[file] = (
+                            state['loaded'],
+                            time.monotonic() - state['started'],
+                        )
+        return done
+
+    def check_foreign_keys(self):
+        """Проверяет ссылки, пока PRAGMA foreign_keys была выключена."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_key_check')
+            violations = cursor.fetchall()
+        if violations:
+            tables = sorted({table for table, *_ in violations})
+            raise CommandError(
+                f'Найдено {len(violations)} ссылок на несуществующие записи '
+                f'в таблицах: {", ".join(tables)}'
+            )
+
+    @contextmanager
+    def bulk_load_settings(self):
+        """Включает PRAGMA для массовой загрузки и затем возвращает прежние.
+
+        Журнал остается в памяти, а не выключается совсем, чтобы откат
+        транзакции при ошибке в файле был возможен. Внешние ключи
+        проверяются одним проходом после загрузки.
+        """
+        saved = {}
+        with connection.cursor() as cursor:
+            for pragma, value in BULK_LOAD_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {pragma}')
+                saved[pragma] = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for pragma, value in saved.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+
+    @contextmanager
+    def deferred_indexes(self, model):
+        """Удаляет вторичные индексы таблицы и создает их при выходе.
+
+        Индексы уникальности (sqlite_autoindex_*) удалить нельзя, они
+        остаются. Время перестроения записывается в список-результат.
+        """
+        timing = [0]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                'AND tbl_name = %s AND sql IS NOT NULL',
+                [model._meta.db_table]
+            )
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(
+                    f'DROP INDEX {connection.ops.quote_name(name)}'
+                )
+        try:
+            yield timing
+        finally:
+            started = time.monotonic()
+            with connection.cursor() as cursor:
+                for _, sql in indexes:
+                    cursor.execute(sql)
+            timing[0] = time.monotonic() - started
+
+    def report_timings(self, timings):
+        self.stdout.write(
+            f'{"этап":<16}{"строк":>10}{"загрузка, с":>14}{"индексы, с":>13}'
+        )
+        for name, rows, load_time, index_time in timings:
+            rows = '' if rows is None else rows
+            self.stdout.write(
+                f'{name:<16}{rows:>10}{load_time:>14.2f}{index_time:>13.2f}'
+            )
+
+    def clear_tables(self):
+        """Очищает таблицы в порядке, обратном зависимостям.
+
+        ORM-удаление отзывов и произведений выбирает в память каждую строку
+        ради сигналов рейтинга, поэтому эти таблицы очищаются одним DELETE,
+        а рейтинг пересчитывается после загрузки. Пользователи удаляются
+        через ORM: на них ссылаются таблицы вне импорта (группы, права).
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            for _, model in reversed(CSV_FILES_MODELS):
+                if model is User:
+                    model.objects.all().delete()
+                    continue
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f'DELETE FROM {table}')
+
+    def load_file(self, path, model, batch_size):
+        """Загружает файл пачками, не держа в памяти больше одной пачки.
+
+        Строки вставляются через executemany (см. load_raw), минуя
+        создание объектов модели. Даты из файла сохраняются, в том числе
+        для полей с auto_now_add: выгрузка export_db загружается обратно
+        без потери дат публикации.
+        """
+        header, rows = read_raw(path)
+        return self.load_raw(
+            os.path.basename(path), model, header, rows, batch_size,
+            auto_now_add=True
+        )
+
+    def load_raw(self, name, model, header, rows, batch_size,
+                 auto_now_add=False):
+        """Вставляет строки-последовательности пачками через executemany.
+
+        Значения приводятся RowConverter в порядке столбцов header.
+        """
+        converter = RowConverter(model, header, auto_now_add=auto_now_add)
+        started = time.monotonic()
+        loaded = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for batch in batches(map(converter.convert, rows), batch_size):
+                cursor.executemany(converter.sql, batch)
+                loaded += len(batch)
+                reset_queries()
+                if self.verbosity > 1:
+                    self.report(name, loaded, started)
+        self.table_loaded(name, loaded, started)
+        return loaded
+
+    def report(self, name, loaded, started):
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{name}: {loaded} строк за {elapsed:.2f} с ({rate:.0f} строк/с)'
+        )
+
+    def table_loaded(self, name, loaded, started):
+        """Выводит итог по файлу и учитывает его в метриках импорта."""
+        self.report(name, loaded, started)
+        record_csv_import(name, loaded, time.monotonic() - started)
+
+    def upsert(self, path, batch_size, delete_missing=False):
+        """Синхронизирует базу с файлами по первичным ключам.
+
+        Строки файла сравниваются с базой пачками: для каждой пачки
+        выбираются хеши только ее строк. С delete_missing строки, которых
+        нет в файлах, удаляются в обратном порядке зависимостей после всех
+        вставок; файл без строк при этом считается ошибкой, а не просьбой
+        очистить таблицу.
+        """
+        self.stdout.write(self.style.NOTICE('Синхронизация данных'))
+        self.rating_titles = set()
+        seen = []
+        with transaction.atomic():
+            for file, model in CSV_FILES_MODELS:
+                seen.append((file, model, self.upsert_file(
+                    os.path.join(path, file), model, batch_size
+                )))
+            if delete_missing:
+                for file, model, pks in reversed(seen):
+                    if pks is None:
+                        raise CommandError(
+                            f'{file}: в файле нет строк, удаление всех '
+                            'записей таблицы отменено'
+                        )
+                    deleted = self.delete_missing(model, pks, batch_size)
+                    self.stdout.write(f'{file}: удалено {deleted}')
+            for batch in batches(sorted(self.rating_titles), batch_size):
+                Title.objects.filter(pk__in=batch).rebuild_rating()
+        self.stdout.write(self.style.SUCCESS('Синхронизация завершена'))
+
+    def delete_missing(self, model, seen, batch_size):
+        """Удаляет строки, pk которых нет в seen; возвращает их число.
+
+        Первичные ключи таблицы читаются пачками по возрастанию, поэтому
+        в памяти нет полного списка ни строк базы, ни удаляемых pk.
+        """
+        deleted = 0
+        pks = model.objects.order_by('pk').values_list('pk', flat=True)
+        batch = list(pks[:batch_size])
+        while batch:
+            missing = [pk for pk in batch if pk not in seen]
+            if missing:
+                _, counts = model.objects.filter(pk__in=missing).delete()
+                deleted += counts.get(model._meta.label, 0)
+            batch = list(pks.filter(pk__gt=batch[-1])[:batch_size])
+        return deleted
+
+    def upsert_file(self, path, model, batch_size):
+        """Добавляет и обновляет строки файла.
+
+        Возвращает IdSet первичных ключей файла или None, если в файле нет
+        строк.
+        """
+        name = os.path.basename(path)
+        started = time.monotonic()
+        rows = read_rows(path, model)
+        first = next(rows, None)
+        if first is None:
+            self.stdout.write(f'{name}: в файле нет строк')
+            return None
+        fields = compared_fields(model, first)
+        attnames = [field.attname for field in fields]
+        pk_field = model._meta.pk
+        keys = list(first)
+        converter = RowConverter(model, keys, auto_now_add=True)
+
+        seen = IdSet()
+        inserted = updated = unchanged = 0
+        for batch in batches(chain((first,), rows), batch_size):
+            pks = [pk_field.to_python(row[pk_field.attname]) for row in batch]
+            existing = {
+                values[0]: row_hash(fields, values[1:])
+                for values in model.objects.filter(pk__in=pks).order_by(
+                ).values_list('pk', *attnames)
+            }
+            created, changed = [], []
+            for pk, row in zip(pks, batch):
+                seen.add(pk)
+                digest = row_hash(
+                    fields, (row[attname] for attname in attnames)
+                )
+                old_digest = existing.get(pk)
+                if old_digest is None:
+                    created.append(row)
+                elif old_digest != digest:
+                    changed.append(model(**row))
+                else:
+                    unchanged += 1
+            if model is Review:
+                self.rating_titles.update(
+                    int(row['title_id']) for row in created
+                )
+                self.rating_titles.update(
+                    int(review.title_id) for review in changed
+                )
+                self.rating_titles.update(Review.objects.filter(
+                    pk__in=[review.pk for review in changed]
+                ).values_list('title_id', flat=True))
+            if created:
+                with connection.cursor() as cursor:
+                    cursor.executemany(converter.sql, [
+                        converter.convert([row[key] for key in keys])
+                        for row in created
+                    ])
+            if changed:
+                model.objects.bulk_update(changed, attnames)
+            inserted += len(created)
+            updated += len(changed)
+            reset_queries()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{name}: добавлено {inserted}, обновлено {updated}, '
+            f'без изменений {unchanged} за {elapsed:.2f} с'
+        )
+        return seen
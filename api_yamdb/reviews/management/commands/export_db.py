@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from reviews.export import EXPORT_DATASETS, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгружает каталог в файлы .csv или .ndjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'datasets',
+            nargs='*',
+            metavar='dataset',
+            help='Наборы для выгрузки, по умолчанию все: '
+                 + ', '.join(EXPORT_DATASETS),
+        )
+        parser.add_argument(
+            '--path',
+            default='.',
+            help='Каталог для файлов выгрузки.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='Формат файлов; csv загружается обратно командой csv_db.',
+        )
+
+    def handle(self, *args, **options):
+        datasets = options['datasets'] or list(EXPORT_DATASETS)
+        unknown = set(datasets) - set(EXPORT_DATASETS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные наборы: {", ".join(sorted(unknown))}'
+            )
+        os.makedirs(options['path'], exist_ok=True)
+        for dataset in datasets:
+            name = f'{dataset}.{options["format"]}'
+            started = time.monotonic()
+            with open(os.path.join(options['path'], name), 'w',
+                      encoding='utf-8', newline='') as f:
+                rows = -1 if options['format'] == 'csv' else 0
+                for line in export_lines(dataset, options['format']):
+                    f.write(line)
+                    rows += 1
+            self.stdout.write(
+                f'{name}: {rows} строк за {time.monotonic() - started:.2f} с'
+            )
@@ -0,0 +1,103 @@
+import os
+import time
+from contextlib import nullcontext
+
+from django.core.management import CommandError
+from django.db import connection
+
+from reviews.export import EXPORT_DATASETS, csv_lines
+from reviews.management.commands import csv_db
+from reviews.synthetic import SyntheticDataset
+
+DATASET_OPTIONS = (
+    ('users', int, 1000, 'Число пользователей.'),
+    ('titles', int, 1000, 'Число произведений.'),
+    ('reviews', int, 10000, 'Число отзывов; на произведение — по Ципфу.'),
+    ('comments', int, 10000, 'Число комментариев; на отзыв — по Ципфу.'),
+    ('categories', int, 10, 'Число категорий.'),
+    ('genres', int, 30, 'Число жанров.'),
+    ('genres_per_title', int, 3, 'Наибольшее число жанров произведения.'),
+    ('skew', float, 1.1, 'Показатель степени распределения Ципфа.'),
+    ('seed', int, 1, 'Начальное значение генератора случайных чисел.'),
+)
+
+
+class Command(csv_db.Command):
+    help = 'Создает синтетический набор данных в базе или в файлах .csv'
+
+    def add_arguments(self, parser):
+        for name, type_, default, help_text in DATASET_OPTIONS:
+            parser.add_argument(
+                f'--{name.replace("_", "-")}',
+                type=type_,
+                default=default,
+                help=help_text,
+            )
+        parser.add_argument(
+            '--path',
+            help='Записать файлы для csv_db в этот каталог вместо загрузки '
+                 'в базу.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=csv_db.BATCH_SIZE,
+            help='Число строк в одной пачке вставки.',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            dataset = SyntheticDataset(**{
+                name: options[name] for name, *_ in DATASET_OPTIONS
+            })
+        except ValueError as error:
+            raise CommandError(error)
+
+        started = time.monotonic()
+        if options['path']:
+            self.write_files(dataset, options['path'])
+        else:
+            fast = connection.vendor == 'sqlite'
+            with self.bulk_load_settings() if fast else nullcontext():
+                self.generate(dataset, options['batch_size'], fast)
+        self.stdout.write(f'Всего: {time.monotonic() - started:.2f} с')
+
+    def generate(self, dataset, batch_size, fast):
+        """Заменяет данные таблиц сгенерированными строками.
+
+        Как и `csv_db --fast`, на SQLite индексы строятся после вставки.
+        Даты публикации берутся из набора, а не из auto_now_add.
+        """
+        def load(timings):
+            self.clear_tables()
+            for name, (model, columns) in EXPORT_DATASETS.items():
+                indexes = (
+                    self.deferred_indexes(model) if fast else nullcontext()
+                )
+                with indexes as index_timing:
+                    started = time.monotonic()
+                    loaded = self.load_raw(
+                        name, model, columns, dataset.rows(name), batch_size,
+                        auto_now_add=True
+                    )
+                    load_time = time.monotonic() - started
+                timings.append(
+                    (name, loaded, load_time, index_timing[0] if fast else 0)
+                )
+
+        self.replace_tables(load, fast)
+        self.stdout.write(self.style.SUCCESS('Набор данных создан'))
+
+    def write_files(self, dataset, path):
+        os.makedirs(path, exist_ok=True)
+        for name, (_, columns) in EXPORT_DATASETS.items():
+            file = f'{name}.csv'
+            started = time.monotonic()
+            with open(os.path.join(path, file), 'w', encoding='utf-8',
+                      newline='') as f:
+                rows = -1
+                for line in csv_lines(columns, dataset.rows(name)):
+                    f.write(line)
+                    rows += 1
+            self.report(file, rows, started)
@@ -0,0 +1,42 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Title
+
+DRIFT_SAMPLE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = 'Проверяет и пересчитывает сохраненный рейтинг произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не изменяя.',
+        )
+
+    def handle(self, *args, **options):
+        drift = Title.objects.rating_drift()
+        drift_count = drift.count()
+        for title in drift.order_by('pk')[:DRIFT_SAMPLE_SIZE]:
+            self.stdout.write(
+                f'{title.pk}: сохранено {title.score_sum}/{title.score_count},'
+                f' по отзывам {title.actual_score_sum}/'
+                f'{title.actual_score_count}'
+            )
+
+        if options['check']:
+            if drift_count:
+                raise CommandError(
+                    f'Рейтинг расходится у {drift_count} произведений'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+
+        with transaction.atomic():
+            updated = Title.objects.rebuild_rating()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан для {updated} произведений, '
+            f'исправлено расхождений: {drift_count}'
+        ))
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from reviews.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди исходящих писем'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX['BATCH_SIZE'],
+            help='Число писем, отправляемых через одно соединение.',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Ждать новые письма до остановки команды.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.EMAIL_OUTBOX['POLL_INTERVAL'],
+            help='Пауза при пустой очереди в режиме --loop, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'Отправлено {sent}, ошибок {failed}'
+                    )
+                if sent + failed == options['batch_size']:
+                    continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(
+            f'Отправлено писем: {total_sent}, ошибок: {total_failed}'
+        )
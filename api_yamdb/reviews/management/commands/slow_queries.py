@@ -0,0 +1,71 @@
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from reviews.slow_queries import read_log
+
+ORDERINGS = {
+    'total': lambda item: item['total_ms'],
+    'count': lambda item: item['count'],
+    'max': lambda item: item['max_ms'],
+    'mean': lambda item: item['total_ms'] / item['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Выводит самые затратные медленные SQL-запросы из журнала'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=settings.SLOW_QUERIES['PATH'],
+            help='Файл журнала медленных запросов.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Число выводимых отпечатков запросов.',
+        )
+        parser.add_argument(
+            '--order',
+            choices=ORDERINGS,
+            default='total',
+            help='Порядок: по суммарному, наибольшему или среднему времени '
+                 'либо по числу запросов.',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Очистить журнал после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Журнал {path} не найден')
+        stats = read_log(path)
+        top = sorted(
+            stats.items(), key=lambda item: ORDERINGS[options['order']](
+                item[1]
+            ), reverse=True
+        )[:options['limit']]
+        self.stdout.write(
+            f'Отпечатков: {len(stats)}, медленных запросов: '
+            f'{sum(item["count"] for item in stats.values())}'
+        )
+        for number, (key, item) in enumerate(top, 1):
+            self.stdout.write(
+                f'\n{number}. [{key}] {item["count"]} раз, всего '
+                f'{item["total_ms"]:.1f} мс, среднее '
+                f'{item["total_ms"] / item["count"]:.1f} мс, наибольшее '
+                f'{item["max_ms"]:.1f} мс'
+            )
+            self.stdout.write(f'   {item["sql"]}')
+            if item['plan']:
+                self.stdout.write('   План:')
+                for line in item['plan'].splitlines():
+                    self.stdout.write(f'     {line}')
+        if options['clear']:
+            open(path, 'w').close()
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from reviews.replication import sync_replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик для чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Повторять копирование до остановки команды.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.REPLICATION['SYNC_INTERVAL'],
+            help='Пауза между копированиями в режиме --loop, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICATION['REPLICAS']:
+            raise CommandError(
+                'Реплики не настроены: задайте DATABASE_REPLICAS.'
+            )
+        while True:
+            for alias, seconds in sync_replicas().items():
+                if options['verbosity'] > 1 or not options['loop']:
+                    self.stdout.write(
+                        f'{alias}: скопирована за {seconds * 1000:.1f} мс'
+                    )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,451 @@
+"""Метрики сервиса в текстовом формате Prometheus.
+
+Метрики собираются, только если включен `METRICS['ENABLED']`, и хранятся
+в памяти процесса в реестре `registry`. Под сервером с несколькими
+процессами (gunicorn, uWSGI) каждый процесс периодически сохраняет свои
+значения в файл каталога `METRICS['MULTIPROCESS_DIR']`, а эндпоинт
+суммирует файлы всех процессов. Завершившийся процесс (и процесс, чей
+файл остался после аварийного завершения) складывает свои значения в
+общий файл `archive.json` и удаляет свой, поэтому счетчики не убывают, а
+число файлов не растет с перезапусками. Каталог хранит значения между
+запусками сервера; чтобы обнулить счетчики, очистите его перед стартом.
+Доли попаданий в кеш и скорость импорта вычисляются из суммированных
+счетчиков при выводе.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager, suppress
+from itertools import chain
+
+from django.conf import settings
+
+FLUSH_INTERVAL = 1.0
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ARCHIVE_FILE = 'archive.json'
+ARCHIVE_LOCK = 'archive.lock'
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = (
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in zip(names, values)
+    )
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metric(ABC):
+    """Метрика с метками; значения — по кортежам значений меток."""
+
+    type = None
+
+    def __init__(self, registry, name, help_text, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def lines(self, samples):
+        """Строки текстового формата для значений по меткам."""
+
+
+class SampledMetric(Metric):
+    """Метрика, значения которой копятся в процессах и складываются."""
+
+    @abstractmethod
+    def empty(self):
+        """Значение метки до первого наблюдения."""
+
+    @abstractmethod
+    def merge(self, value, other):
+        """Сумма значений одной метки из двух процессов."""
+
+
+class Counter(SampledMetric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.registry.lock:
+            samples = self.registry.samples[self.name]
+            samples[labels] = samples.get(labels, 0) + amount
+
+    def empty(self):
+        return 0
+
+    def merge(self, value, other):
+        return value + other
+
+    def lines(self, samples):
+        for labels, value in sorted(samples.items()):
+            yield (f'{self.name}{format_labels(self.labels, labels)} '
+                   f'{format_value(value)}')
+
+
+class Histogram(SampledMetric):
+    """Гистограмма: число наблюдений по корзинам и их сумма."""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, help_text, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            samples = self.registry.samples[self.name]
+            sample = samples.get(labels)
+            if sample is None:
+                sample = samples[labels] = self.empty()
+            sample[index] += 1
+            sample[-1] += value
+
+    def empty(self):
+        return [0] * (len(self.buckets) + 1) + [0]
+
+    def merge(self, value, other):
+        return [first + second for first, second in zip(value, other)]
+
+    def lines(self, samples):
+        names = self.labels + ('le',)
+        bounds = [format_value(float(bound)) for bound in self.buckets]
+        bounds.append('+Inf')
+        for labels, sample in sorted(samples.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, sample[:-1]):
+                cumulative += count
+                yield (f'{self.name}_bucket'
+                       f'{format_labels(names, labels + (bound,))} '
+                       f'{cumulative}')
+            suffix = format_labels(self.labels, labels)
+            yield f'{self.name}_sum{suffix} {format_value(sample[-1])}'
+            yield f'{self.name}_count{suffix} {cumulative}'
+
+
+class Gauge(Metric):
+    """Производная метрика: считается из суммированных значений."""
+
+    type = 'gauge'
+
+    def __init__(self, registry, name, help_text, labels, function):
+        super().__init__(registry, name, help_text, labels)
+        self.function = function
+
+    def lines(self, samples):
+        for labels, value in sorted(samples.items()):
+            yield (f'{self.name}{format_labels(self.labels, labels)} '
+                   f'{format_value(value)}')
+
+
+def read_samples(path):
+    """Значения из файла процесса или архива; None, если файла нет."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return {
+        name: {tuple(labels): value for labels, value in samples}
+        for name, samples in data.items()
+    }
+
+
+def write_samples(path, totals):
+    data = {
+        name: [[list(labels), value] for labels, value in samples.items()]
+        for name, samples in totals.items()
+    }
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def process_alive(file):
+    """Жив ли процесс, записавший файл `<pid>-<метка>.json`.
+
+    Файлы с другими именами считаются живыми и не переносятся в архив.
+    """
+    try:
+        pid = int(file.split('-', 1)[0])
+    except ValueError:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """Реестр метрик процесса и их суммирование между процессами."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.file = None
+        self.last_flush = 0.0
+        os.register_at_fork(after_in_child=self.after_fork)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        if not isinstance(metric, Gauge):
+            self.samples[metric.name] = {}
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(self, name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(
+            Histogram(self, name, help_text, labels, buckets)
+        )
+
+    def gauge(self, name, help_text, labels, function):
+        return self.register(Gauge(self, name, help_text, labels, function))
+
+    @property
+    def directory(self):
+        return settings.METRICS['MULTIPROCESS_DIR']
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    labels: list(value) if isinstance(value, list) else value
+                    for labels, value in samples.items()
+                }
+                for name, samples in self.samples.items()
+            }
+
+    def after_fork(self):
+        """Дочерний процесс начинает с нуля и пишет в свой файл.
+
+        Значения, унаследованные от родителя, уже учтены в его файле.
+        """
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        for samples in self.samples.values():
+            samples.clear()
+        self.file = None
+        self.last_flush = 0.0
+
+    def flush(self, force=False):
+        """Сохраняет значения процесса не чаще раза в FLUSH_INTERVAL."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_flush < FLUSH_INTERVAL:
+            return
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            self.last_flush = now
+            if self.file is None:
+                self.file = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+            os.makedirs(self.directory, exist_ok=True)
+            write_samples(
+                os.path.join(self.directory, self.file), self.snapshot()
+            )
+        finally:
+            self.flush_lock.release()
+
+    def merge(self, totals, samples):
+        """Прибавляет к totals значения другого процесса."""
+        for name, values in samples.items():
+            metric = self.metrics.get(name)
+            merged = totals.setdefault(name, {})
+            for labels, value in values.items():
+                if labels not in merged:
+                    merged[labels] = value
+                elif metric is not None:
+                    merged[labels] = metric.merge(merged[labels], value)
+        return totals
+
+    @contextmanager
+    def archive_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ARCHIVE_LOCK), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def archive(self, samples, files=(), replaced=None):
+        """Складывает значения и файлы процессов в архив, файлы удаляет.
+
+        Файлы читаются под блокировкой: файл, который уже перенес другой
+        процесс, к этому моменту удален и не учитывается дважды. Файл
+        replaced содержит прежнюю копию samples и только удаляется.
+        """
+        with self.archive_lock():
+            path = os.path.join(self.directory, ARCHIVE_FILE)
+            totals = read_samples(path) or {}
+            self.merge(totals, samples)
+            for file in files:
+                data = read_samples(os.path.join(self.directory, file))
+                if data is not None:
+                    self.merge(totals, data)
+            write_samples(path, totals)
+            for file in (*files, replaced):
+                if file is not None:
+                    with suppress(FileNotFoundError):
+                        os.remove(os.path.join(self.directory, file))
+
+    def retire(self):
+        """При выходе процесса переносит его значения в архив."""
+        if not self.directory:
+            return
+        with self.flush_lock:
+            samples = self.snapshot()
+            if self.file is None and not any(samples.values()):
+                return
+            self.archive(samples, replaced=self.file)
+            self.file = None
+            for values in self.samples.values():
+                values.clear()
+
+    def aggregate(self):
+        """Значения процесса, сложенные с файлами остальных процессов.
+
+        Файлы процессов, которых уже нет, сначала переносятся в архив.
+        """
+        totals = self.snapshot()
+        if not self.directory or not os.path.isdir(self.directory):
+            return totals
+        files = [
+            file for file in os.listdir(self.directory)
+            if file.endswith('.json')
+            and file not in (self.file, ARCHIVE_FILE)
+        ]
+        dead = [file for file in files if not process_alive(file)]
+        if dead:
+            self.archive({}, dead)
+        for file in chain(
+            (file for file in files if file not in dead), (ARCHIVE_FILE,)
+        ):
+            data = read_samples(os.path.join(self.directory, file))
+            if data is not None:
+                self.merge(totals, data)
+        return totals
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        totals = self.aggregate()
+        lines = []
+        for name, metric in self.metrics.items():
+            samples = (
+                metric.function(totals) if isinstance(metric, Gauge)
+                else totals.get(name, {})
+            )
+            lines.append(f'# HELP {name} {metric.help_text}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.lines(samples))
+        return '\n'.join(lines) + '\n'
+
+
+def cache_hit_ratio(totals):
+    hits, lookups = {}, {}
+    for (cache, result), value in totals.get(
+        'yamdb_cache_requests_total', {}
+    ).items():
+        lookups[cache] = lookups.get(cache, 0) + value
+        if result == 'hit':
+            hits[cache] = hits.get(cache, 0) + value
+    return {
+        (cache,): hits.get(cache, 0) / total
+        for cache, total in lookups.items() if total
+    }
+
+
+def csv_import_rate(totals):
+    seconds = totals.get('yamdb_csv_import_seconds_total', {})
+    return {
+        labels: rows / seconds[labels]
+        for labels, rows in totals.get(
+            'yamdb_csv_import_rows_total', {}
+        ).items()
+        if seconds.get(labels)
+    }
+
+
+registry = Registry()
+http_requests = registry.counter(
+    'yamdb_http_requests_total', 'Число запросов к API.',
+    ('route', 'method', 'status'),
+)
+http_request_duration = registry.histogram(
+    'yamdb_http_request_duration_seconds', 'Время обработки запроса.',
+    ('route', 'method'),
+)
+http_request_queries = registry.histogram(
+    'yamdb_http_request_db_queries', 'Число SQL-запросов на запрос к API.',
+    ('route', 'method'), buckets=QUERY_COUNT_BUCKETS,
+)
+cache_requests = registry.counter(
+    'yamdb_cache_requests_total', 'Обращения к кешам по результату.',
+    ('cache', 'result'),
+)
+registry.gauge(
+    'yamdb_cache_hit_ratio', 'Доля попаданий в кеш.', ('cache',),
+    cache_hit_ratio,
+)
+csv_import_rows = registry.counter(
+    'yamdb_csv_import_rows_total', 'Число строк, загруженных из CSV.',
+    ('table',),
+)
+csv_import_seconds = registry.counter(
+    'yamdb_csv_import_seconds_total', 'Время загрузки CSV.', ('table',),
+)
+registry.gauge(
+    'yamdb_csv_import_rows_per_second',
+    'Скорость загрузки CSV по всем импортам.', ('table',), csv_import_rate,
+)
+atexit.register(registry.retire)
+
+
+def enabled():
+    return settings.METRICS['ENABLED']
+
+
+def observe_request(route, method, status, duration, queries):
+    http_requests.inc(route, method, str(status))
+    http_request_duration.observe(duration, route, method)
+    http_request_queries.observe(queries, route, method)
+    registry.flush()
+
+
+def record_cache(cache, hit):
+    if not enabled():
+        return
+    cache_requests.inc(cache, 'hit' if hit else 'miss')
+
+
+def record_csv_import(table, rows, seconds):
+    if not enabled():
+        return
+    csv_import_rows.inc(table, amount=rows)
+    csv_import_seconds.inc(table, amount=seconds)
+    registry.flush()
@@ -2,15 +2,19 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.tokens import default_token_generator
 from django.core.validators import (MaxValueValidator, MinValueValidator)
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import (Count, ExpressionWrapper, F, FloatField,
+                              OuterRef, Q, Subquery, Sum)
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .constants import (MAX_LENGTH_CATEGORY_GENRE,
-                        MAX_LENGTH_CONFIRMATION_CODE,
-                        MAX_LENGTH_EMAIL, MAX_LENGTH_ROLE, MAX_LENGTH_TITLE,
-                        MAX_LENGTH_USERNAME, SCORE_VALIDATOR_MAX_VALUE,
-                        SCORE_VALIDATOR_MIN_VALUE, TITLE_CUT,)
+from .constants import (MAX_LENGTH_CATEGORY_GENRE, MAX_LENGTH_EMAIL,
+                        MAX_LENGTH_EMAIL_SUBJECT, MAX_LENGTH_ROLE,
+                        MAX_LENGTH_TITLE, MAX_LENGTH_USERNAME,
+                        SCORE_VALIDATOR_MAX_VALUE, SCORE_VALIDATOR_MIN_VALUE,
+                        TITLE_CUT,)
 from .validators import validate_username, validate_year
 
 USER = 'user'
@@ -46,13 +50,6 @@ class User(AbstractUser):
         blank=True,
     )
 
-    confirmation_code = models.CharField(
-        'код подтверждения',
-        max_length=MAX_LENGTH_CONFIRMATION_CODE,
-        null=True,
-        default='XXXX'
-    )
-
     class Meta:
         ordering = ('username',)
         verbose_name = 'Пользователь'
@@ -69,15 +66,16 @@ class User(AbstractUser):
     def is_moderator(self):
         return self.role == MODERATOR
 
+    @property
+    def confirmation_code(self):
+        """Действующий код подтверждения.
 
-@receiver(post_save, sender=User)
-def post_save(sender, instance, created, **kwargs):
-    if created:
-        confirmation_code = default_token_generator.make_token(
-            instance
-        )
-        instance.confirmation_code = confirmation_code
-        instance.save()
+        Код вычисляется генератором токенов по данным пользователя и не
+        хранится: создание пользователя, в том числе через bulk_create,
+        обходится одной вставкой, а код перестает действовать после входа
+        или смены почты.
+        """
+        return default_token_generator.make_token(self)
 
 
 class AddNameSlugFields(models.Model):
@@ -111,9 +109,72 @@ class Genre(AddNameSlugFields):
         verbose_name_plural = 'Жанры'
 
 
+def rating_expression(score_sum, score_count):
+    """Рейтинг как среднее оценок; NULL, если отзывов нет."""
+    return ExpressionWrapper(
+        Cast(score_sum, FloatField()) / NullIf(score_count, 0),
+        output_field=FloatField(),
+    )
+
+
+def review_totals():
+    """Подзапросы суммы и числа оценок отзывов текущего произведения."""
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    return (
+        Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')), 0
+        ),
+        Coalesce(
+            Subquery(reviews.annotate(total=Count('pk')).values('total')), 0
+        ),
+    )
+
+
+class TitleQuerySet(models.QuerySet):
+    """Операции над сохраненным рейтингом произведений."""
+
+    def change_rating(self, score_delta, count_delta):
+        """Атомарно сдвигает сумму и число оценок на дельту."""
+        score_sum = F('score_sum') + score_delta
+        score_count = F('score_count') + count_delta
+        return self.update(
+            score_sum=score_sum,
+            score_count=score_count,
+            rating=rating_expression(score_sum, score_count),
+        )
+
+    def with_actual_rating(self):
+        """Аннотирует сумму и число оценок, посчитанные по отзывам."""
+        score_sum, score_count = review_totals()
+        return self.annotate(
+            actual_score_sum=score_sum,
+            actual_score_count=score_count,
+        )
+
+    def rating_drift(self):
+        """Произведения, у которых сохраненный рейтинг разошелся с отзывами."""
+        return self.with_actual_rating().filter(
+            ~Q(score_sum=F('actual_score_sum'))
+            | ~Q(score_count=F('actual_score_count'))
+        )
+
+    def rebuild_rating(self):
+        """Пересчитывает сохраненный рейтинг по таблице отзывов."""
+        score_sum, score_count = review_totals()
+        return self.update(
+            score_sum=score_sum,
+            score_count=score_count,
+            rating=rating_expression(score_sum, score_count),
+        )
+
+
 class Title(models.Model):
     """Класс произведение."""
 
+    RATING_FIELDS = ('score_sum', 'score_count', 'rating')
+
     name = models.CharField('Название произведения',
                             max_length=MAX_LENGTH_TITLE)
     year = models.SmallIntegerField('Год выпуска', validators=[validate_year])
@@ -125,16 +186,65 @@ class Title(models.Model):
                                  on_delete=models.SET_NULL,
                                  null=True,
                                  verbose_name='Категория')
+    score_sum = models.PositiveIntegerField('Сумма оценок', default=0,
+                                            editable=False)
+    score_count = models.PositiveIntegerField('Количество оценок',
+                                              default=0, editable=False)
+    rating = models.FloatField('Рейтинг', null=True, editable=False)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('name',)
         default_related_name = 'titles'
+        indexes = (
+            models.Index(fields=('rating',), name='title_rating_idx'),
+            models.Index(fields=('year', 'rating'),
+                         name='title_year_rating_idx'),
+            models.Index(fields=('category', 'rating'),
+                         name='title_category_rating_idx'),
+        )
 
     def __str__(self):
         return self.name[:TITLE_CUT]
 
+    def save(self, *args, **kwargs):
+        """Не перезаписывает рейтинг, который ведут отзывы."""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class TitleSearch(models.Model):
+    """Полнотекстовый индекс произведений (таблица FTS5, см. search.py).
+
+    Таблицу и триггеры создает миграция 0006, модель нужна только для
+    соединения с ней в запросах: столбец `document` — скрытый столбец
+    FTS5 с именем таблицы, равенство ему означает MATCH, а `rank` —
+    релевантность, вычисленная тем же проходом поиска.
+    """
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index',
+    )
+    document = models.TextField(db_column='reviews_title_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'reviews_title_fts'
+
 
 class GenreTitle(models.Model):
     """Класс связи произведения с жанрами."""
@@ -148,6 +258,10 @@ class GenreTitle(models.Model):
         verbose_name = 'произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('title',)
+        indexes = (
+            models.Index(fields=('genre', 'title'),
+                         name='genretitle_genre_title_idx'),
+        )
 
     def __str__(self):
         return f'{self.title} относится к {self.genre}'
@@ -179,6 +293,8 @@ class BaseReview(models.Model):
 class Review(BaseReview):
     """Класс отзыва и рейтинга."""
 
+    RATING_FIELDS = frozenset(('score', 'title', 'title_id'))
+
     score = models.PositiveIntegerField(
         verbose_name='Оценка',
         validators=(
@@ -198,10 +314,14 @@ class Review(BaseReview):
         verbose_name='Название произведения',
     )
 
-    class Meta:
+    class Meta(BaseReview.Meta):
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         default_related_name = 'reviews'
+        indexes = (
+            models.Index(fields=('title', '-pub_date', '-id'),
+                         name='review_title_pub_date_idx'),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('author', 'title'),
@@ -209,6 +329,30 @@ class Review(BaseReview):
             ),
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает оценку и произведение на момент загрузки."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = (
+            instance.__dict__.get('title_id'),
+            instance.__dict__.get('score'),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет отзыв и рейтинг в одной транзакции.
+
+        Изменение, не затрагивающее оценку и произведение, рейтинг не
+        меняет и записывается без транзакции.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.RATING_FIELDS.intersection(
+            update_fields
+        ):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Comment(BaseReview):
     """Класс комментария."""
@@ -219,7 +363,77 @@ class Comment(BaseReview):
         verbose_name='Отзыв',
     )
 
-    class Meta:
+    class Meta(BaseReview.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = (
+            models.Index(fields=('review', '-pub_date', '-id'),
+                         name='comment_review_pub_date_idx'),
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_post_save(sender, instance, created, **kwargs):
+    """Обновляет сохраненный рейтинг произведения после записи отзыва."""
+    titles = Title.objects.using(kwargs.get('using'))
+    loaded = getattr(instance, '_loaded_rating', None)
+    if created:
+        titles.filter(pk=instance.title_id).change_rating(instance.score, 1)
+    elif loaded is None or None in loaded:
+        titles.filter(pk=instance.title_id).rebuild_rating()
+    else:
+        title_id, score = loaded
+        if title_id != instance.title_id:
+            titles.filter(pk=title_id).change_rating(-score, -1)
+            titles.filter(pk=instance.title_id).change_rating(
+                instance.score, 1
+            )
+        elif score != instance.score:
+            titles.filter(pk=title_id).change_rating(
+                instance.score - score, 0
+            )
+    instance._loaded_rating = (instance.title_id, instance.score)
+
+
+@receiver(post_delete, sender=Review)
+def review_post_delete(sender, instance, **kwargs):
+    """Вычитает удаленный отзыв, в том числе при каскадном удалении."""
+    Title.objects.using(kwargs.get('using')).filter(
+        pk=instance.title_id
+    ).change_rating(-instance.score, -1)
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку.
+
+    Отправитель захватывает пачку писем, сдвигая `next_attempt` на время
+    аренды: письма упавшего отправителя снова станут доступны по ее
+    истечении. Отправленные письма удаляются из очереди.
+    """
+
+    subject = models.CharField('Тема', max_length=MAX_LENGTH_EMAIL_SUBJECT)
+    message = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=MAX_LENGTH_EMAIL)
+    recipient = models.CharField('Получатель', max_length=MAX_LENGTH_EMAIL)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    next_attempt = models.DateTimeField('Следующая попытка',
+                                        default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    failed = models.BooleanField('Не доставлено', default=False)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    claim = models.UUIDField('Захвачено отправителем', null=True,
+                             editable=False)
+
+    class Meta:
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('next_attempt', 'id')
+        indexes = (
+            models.Index(fields=('failed', 'next_attempt'),
+                         name='outgoingemail_due_idx'),
+            models.Index(fields=('claim',), name='outgoingemail_claim_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
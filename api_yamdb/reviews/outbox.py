@@ -0,0 +1,114 @@
+"""Очередь исходящих писем.
+
+Запрос, которому нужно отправить письмо, только сохраняет его в таблицу
+`OutgoingEmail` и не ждет почтовый сервер. Команда `send_emails` забирает
+письма пачками, отправляет их через одно соединение с сервером и
+повторяет неудачные попытки с паузой, растущей вдвое, пока не исчерпает
+`EMAIL_OUTBOX['MAX_ATTEMPTS']`.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Subquery
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+
+
+def enqueue_email(subject, message, recipient, from_email=None):
+    """Ставит письмо в очередь на отправку."""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        message=message,
+        recipient=recipient,
+        from_email=from_email or settings.EMAIL_SENDER,
+    )
+
+
+def claim_batch(batch_size):
+    """Захватывает пачку писем, срок отправки которых наступил.
+
+    Захват — одно обновление: пачка получает метку отправителя и
+    переносится на время аренды, так что другой отправитель ее не возьмет.
+    """
+    now = timezone.now()
+    claim = uuid.uuid4()
+    due = OutgoingEmail.objects.filter(
+        failed=False, next_attempt__lte=now
+    ).values('pk')[:batch_size]
+    OutgoingEmail.objects.filter(pk__in=Subquery(due)).update(
+        claim=claim,
+        next_attempt=now + timedelta(seconds=settings.EMAIL_OUTBOX['LEASE']),
+    )
+    return list(OutgoingEmail.objects.filter(claim=claim))
+
+
+def retry_delay(attempts):
+    return timedelta(
+        seconds=settings.EMAIL_OUTBOX['RETRY_DELAY'] * 2 ** (attempts - 1)
+    )
+
+
+def send_messages(emails):
+    """Отправляет письма через одно соединение с почтовым сервером.
+
+    Возвращает id отправленных писем и пары (письмо, ошибка) для
+    остальных; ошибка соединения считается неудачей всех писем.
+    """
+    sent, failures = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        return sent, [(email, error) for email in emails]
+    try:
+        for number, email in enumerate(emails):
+            message = EmailMessage(
+                email.subject, email.message, email.from_email,
+                [email.recipient], connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                failures.append((email, error))
+            else:
+                sent.append(email.pk)
+                continue
+            # После ошибки соединение могло оборваться: открываем новое,
+            # иначе бэкенд станет открывать его на каждое письмо.
+            connection.close()
+            try:
+                connection.open()
+            except Exception as error:
+                failures.extend(
+                    (rest, error) for rest in emails[number + 1:]
+                )
+                break
+    finally:
+        connection.close()
+    return sent, failures
+
+
+def deliver_batch(batch_size=None):
+    """Отправляет одну пачку писем; возвращает (отправлено, ошибок)."""
+    options = settings.EMAIL_OUTBOX
+    emails = claim_batch(batch_size or options['BATCH_SIZE'])
+    if not emails:
+        return 0, 0
+    sent, failures = send_messages(emails)
+
+    OutgoingEmail.objects.filter(pk__in=sent).delete()
+    now = timezone.now()
+    for email, error in failures:
+        email.attempts += 1
+        email.last_error = f'{type(error).__name__}: {error}'
+        email.failed = email.attempts >= options['MAX_ATTEMPTS']
+        email.next_attempt = now + retry_delay(email.attempts)
+        email.claim = None
+    OutgoingEmail.objects.bulk_update(
+        [email for email, _ in failures],
+        ('attempts', 'last_error', 'failed', 'next_attempt', 'claim'),
+    )
+    return len(sent), len(failures)
@@ -0,0 +1,94 @@
+"""Чтение с реплик базы данных.
+
+Реплики — копии основной базы `default`, перечисленные в
+`REPLICATION['REPLICAS']`. `ReplicaRouter` направляет запись в основную
+базу, а чтение — в реплику, выбранную для текущего HTTP-запроса
+(`api.mixins.ReplicaReadMixin` выбирает ее для безопасных запросов к
+каталогу и отзывам). Клиент, который недавно писал, читает с основной
+базы, пока реплики не успели обновиться. Реплики SQLite обновляет команда
+`sync_replicas` через backup API.
+"""
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+class Routing:
+    """Выбор базы для запросов одного HTTP-запроса."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+    def use_replica(self):
+        """Выбирает реплику, если клиент не закреплен за основной базой."""
+        replicas = settings.REPLICATION['REPLICAS']
+        if replicas and not self.pinned:
+            self.replica = random.choice(replicas)
+
+
+class ReplicaRouter:
+    """Запись — в основную базу, чтение — в реплику текущего запроса.
+
+    После первой записи запрос до конца читает с основной базы: реплика
+    еще не содержит записанного.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if routing is None or routing.wrote:
+            return None
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = current_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICATION['REPLICAS']:
+            return False
+        return None
+
+
+def copy_database(connection, path):
+    """Копирует базу SQLite соединения в файл через backup API.
+
+    Копия пишется поверх файла реплики: читатели реплики ждут окончания
+    копирования в пределах своего таймаута и затем видят новые данные.
+    """
+    if connection.vendor != 'sqlite':
+        raise ImproperlyConfigured(
+            'Копирование реплик поддерживается только для SQLite.'
+        )
+    connection.ensure_connection()
+    target = sqlite3.connect(path, timeout=30)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+def sync_replicas(aliases=None):
+    """Обновляет реплики из основной базы; возвращает время копирования."""
+    timings = {}
+    for alias in aliases or settings.REPLICATION['REPLICAS']:
+        started = time.perf_counter()
+        copy_database(
+            connections[DEFAULT_DB_ALIAS],
+            str(connections.databases[alias]['NAME'])
+        )
+        timings[alias] = time.perf_counter() - started
+    return timings
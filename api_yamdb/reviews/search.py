@@ -0,0 +1,88 @@
+import re
+
+from django.db import connections
+
+TITLE_SEARCH_TABLE = 'reviews_title_fts'
+
+TITLE_SEARCH_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_SEARCH_TABLE} USING fts5('
+    "name, description, content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+
+    f'CREATE TRIGGER IF NOT EXISTS {TITLE_SEARCH_TABLE}_insert '
+    'AFTER INSERT ON reviews_title BEGIN '
+    f'INSERT INTO {TITLE_SEARCH_TABLE}(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+
+    f'CREATE TRIGGER IF NOT EXISTS {TITLE_SEARCH_TABLE}_delete '
+    'AFTER DELETE ON reviews_title BEGIN '
+    f'INSERT INTO {TITLE_SEARCH_TABLE}'
+    f'({TITLE_SEARCH_TABLE}, rowid, name, description) '
+    "VALUES ('delete', old.id, old.name, old.description); END",
+
+    f'CREATE TRIGGER IF NOT EXISTS {TITLE_SEARCH_TABLE}_update '
+    'AFTER UPDATE OF name, description ON reviews_title BEGIN '
+    f'INSERT INTO {TITLE_SEARCH_TABLE}'
+    f'({TITLE_SEARCH_TABLE}, rowid, name, description) '
+    "VALUES ('delete', old.id, old.name, old.description); "
+    f'INSERT INTO {TITLE_SEARCH_TABLE}(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+)
+
+DROP_TITLE_SEARCH_SQL = (
+    f'DROP TRIGGER IF EXISTS {TITLE_SEARCH_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {TITLE_SEARCH_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TITLE_SEARCH_TABLE}_update',
+    f'DROP TABLE IF EXISTS {TITLE_SEARCH_TABLE}',
+)
+
+
+def create_title_search(connection, rebuild=False):
+    """Создает полнотекстовый индекс произведений и триггеры синхронизации.
+
+    Команды идемпотентны: пересоздание таблицы `reviews_title` при
+    миграциях SQLite удаляет ее триггеры, поэтому они восстанавливаются
+    после каждой миграции.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in TITLE_SEARCH_SQL:
+            cursor.execute(sql)
+        if rebuild:
+            cursor.execute(
+                f'INSERT INTO {TITLE_SEARCH_TABLE}({TITLE_SEARCH_TABLE}) '
+                "VALUES ('rebuild')"
+            )
+
+
+def drop_title_search(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in DROP_TITLE_SEARCH_SQL:
+            cursor.execute(sql)
+
+
+def title_search_match(value):
+    """Переводит пользовательский ввод в запрос FTS5 по префиксам слов."""
+    terms = re.findall(r'\w+', value)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_titles(queryset, value):
+    """Отбирает произведения по полнотекстовому запросу.
+
+    Результат упорядочен по релевантности (bm25), лучшие совпадения первыми.
+    Таблица FTS5 соединяется с произведениями, и MATCH выполняется один
+    раз: релевантность читается в том же проходе, а не подзапросом на
+    каждую найденную строку.
+    """
+    match = title_search_match(value)
+    if not match:
+        return queryset.none()
+    if connections[queryset.db].vendor != 'sqlite':
+        return queryset.filter(name__icontains=value)
+    return queryset.filter(search_index__document=match).order_by(
+        'search_index__rank'
+    )
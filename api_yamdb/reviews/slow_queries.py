@@ -0,0 +1,172 @@
+"""Журнал медленных SQL-запросов.
+
+`SlowQueryLog` подключается к `connection.execute_wrappers` и замеряет
+каждый запрос. Запросы дольше порога группируются по отпечатку — тексту
+SQL без литералов и с одинаково записанными списками `IN`; для каждого
+отпечатка план `EXPLAIN QUERY PLAN` снимается один раз за процесс.
+Медленные запросы дописываются строками JSON в файл, общий для всех
+процессов сервера, а команда `slow_queries` сводит его по отпечаткам.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+
+def normalize_sql(sql):
+    """Текст запроса без литералов и параметров."""
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(sql):
+    """Нормализованный текст запроса и его отпечаток."""
+    normalized = normalize_sql(sql)
+    return normalized, blake2b(
+        normalized.encode(), digest_size=8
+    ).hexdigest()
+
+
+def format_plan(vendor, rows):
+    """План запроса строками; узлы плана SQLite выводятся с отступами."""
+    if vendor != 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    depth, lines = {}, []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return '\n'.join(lines)
+
+
+class SlowQueryLog:
+    """Обертка выполнения запросов, собирающая медленные запросы."""
+
+    def __init__(self, threshold_ms, path=None, explain=True):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.explain = explain
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self.local, 'explaining', False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.record(context['connection'], sql, params, many, duration)
+        return result
+
+    def record(self, connection, sql, params, many, duration):
+        normalized, key = fingerprint(sql)
+        duration_ms = duration * 1000
+        with self.lock:
+            stats = self.stats.get(key)
+            first = stats is None
+            if first:
+                stats = self.stats[key] = {
+                    'sql': normalized, 'count': 0, 'total_ms': 0.0,
+                    'max_ms': 0.0, 'plan': None,
+                }
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+        if first:
+            if self.explain and not many:
+                stats['plan'] = self.explain_plan(connection, sql, params)
+            logger.warning(
+                'Медленный запрос %.1f мс [%s]: %s\n%s', duration_ms, key,
+                normalized, stats['plan'] or '',
+            )
+        else:
+            logger.debug('Медленный запрос %.1f мс [%s]', duration_ms, key)
+        if self.path:
+            self.write({
+                'fingerprint': key,
+                'ms': round(duration_ms, 3),
+                'sql': normalized if first else None,
+                'plan': stats['plan'] if first else None,
+                'time': timezone.now().isoformat(),
+                'pid': os.getpid(),
+            })
+
+    def explain_plan(self, connection, sql, params):
+        if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return None
+        prefix = (
+            'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+            else 'EXPLAIN '
+        )
+        self.local.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                return format_plan(connection.vendor, cursor.fetchall())
+        except DatabaseError:
+            return None
+        finally:
+            self.local.explaining = False
+
+    def write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def read_log(path):
+    """Сводка файла журнала по отпечаткам, как SlowQueryLog.stats."""
+    stats = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            item = stats.setdefault(entry['fingerprint'], {
+                'sql': None, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'plan': None,
+            })
+            item['count'] += 1
+            item['total_ms'] += entry['ms']
+            item['max_ms'] = max(item['max_ms'], entry['ms'])
+            item['sql'] = item['sql'] or entry['sql']
+            item['plan'] = item['plan'] or entry['plan']
+    return stats
+
+
+@lru_cache(maxsize=None)
+def default_log():
+    options = settings.SLOW_QUERIES
+    return SlowQueryLog(
+        options['THRESHOLD_MS'], options['PATH'], options['EXPLAIN']
+    )
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """Обработчик connection_created: подключает общий журнал.
+
+    Соединение может открыться внутри `execute_wrapper()`, который при
+    выходе снимает последнюю обертку, поэтому журнал ставится первым.
+    """
+    log = default_log()
+    if log not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log)
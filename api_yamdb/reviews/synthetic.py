@@ -0,0 +1,181 @@
+"""Воспроизводимый синтетический набор данных для нагрузочных проверок.
+
+Строки выдаются кортежами в порядке столбцов EXPORT_DATASETS, поэтому
+их можно записать в файлы csv_db или вставить в базу напрямую. Набор
+целиком определяется параметрами и seed; в памяти держатся только
+счетчики отзывов по произведениям.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from math import gcd
+
+from .constants import SCORE_VALIDATOR_MAX_VALUE, SCORE_VALIDATOR_MIN_VALUE
+from .models import ADMIN, MODERATOR, USER
+
+TEXT_POOL_SIZE = 1024
+
+FIRST_PUB_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+PUB_DATE_SPAN = timedelta(days=8 * 365)
+
+ROLE_WEIGHTS = ((USER, 0.97), (MODERATOR, 0.02), (ADMIN, 0.01))
+
+WORDS = (
+    'фильм книга песня сюжет герой финал автор музыка история жизнь '
+    'время мир любовь смысл образ роль сцена голос город дорога ночь '
+    'отлично скучно неожиданно сильно слабо честно красиво странно '
+    'рекомендую пересматривать дочитать слушать понравилось ожидал '
+    'the story plot ending great boring classic must see again'
+).split()
+
+
+def zipf_counts(total, buckets, skew, cap, rnd):
+    """Делит total на buckets частей по закону Ципфа, не больше cap в части.
+
+    Части перемешиваются, поэтому популярные произведения не собираются
+    в начале диапазона id.
+    """
+    if total > buckets * cap:
+        raise ValueError(
+            f'Нельзя разместить {total} в {buckets} частях по {cap}'
+        )
+    weights = [rank ** -skew for rank in range(1, buckets + 1)]
+    scale = total / sum(weights)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    remainder = total - sum(counts)
+    while remainder:
+        for index in range(buckets):
+            if remainder and counts[index] < cap:
+                counts[index] += 1
+                remainder -= 1
+    rnd.shuffle(counts)
+    return counts
+
+
+class ZipfSampler:
+    """Случайные номера 1..n с вероятностью, убывающей как rank ** -skew.
+
+    Используется обращение функции распределения непрерывного степенного
+    закона: выборка за O(1) без таблицы весов. Ранги перемешиваются
+    умножением на число, взаимно простое с n.
+    """
+
+    def __init__(self, n, skew, rnd):
+        self.n = n
+        self.rnd = rnd
+        self.exponent = 1 - skew if skew != 1 else None
+        self.top = (n + 1) ** self.exponent if self.exponent else n + 1
+        self.stride = self.coprime_stride(n, rnd)
+
+    @staticmethod
+    def coprime_stride(n, rnd):
+        stride = rnd.randrange(n // 2 + 1, n + 1) if n > 1 else 1
+        while gcd(stride, n) != 1:
+            stride += 1
+        return stride
+
+    def __call__(self):
+        u = self.rnd.random()
+        if self.exponent:
+            rank = int((1 + u * (self.top - 1)) ** (1 / self.exponent))
+        else:
+            rank = int(self.top ** u)
+        rank = min(max(rank, 1), self.n) - 1
+        return rank * self.stride % self.n + 1
+
+
+class SyntheticDataset:
+    """Параметры набора и генераторы строк по наборам csv_db."""
+
+    def __init__(self, users, titles, reviews, comments, categories=10,
+                 genres=30, genres_per_title=3, skew=1.1, seed=1):
+        if reviews > users * titles:
+            raise ValueError(
+                'Отзывов больше, чем пар пользователь — произведение'
+            )
+        self.users = users
+        self.titles = titles
+        self.reviews = reviews
+        self.comments = comments
+        self.categories = categories
+        self.genres = genres
+        self.genres_per_title = min(genres_per_title, genres)
+        self.skew = skew
+        self.seed = seed
+        rnd = random.Random(seed)
+        self.texts = [
+            ' '.join(rnd.choices(WORDS, k=rnd.randint(3, 40))).capitalize()
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    def random(self, name):
+        """Отдельный генератор на набор: наборы не зависят от порядка."""
+        return random.Random(f'{self.seed}:{name}')
+
+    def pub_date(self, rnd):
+        return FIRST_PUB_DATE + PUB_DATE_SPAN * rnd.random()
+
+    def rows(self, dataset):
+        return getattr(self, f'{dataset}_rows')()
+
+    def users_rows(self):
+        rnd = self.random('users')
+        roles, weights = zip(*ROLE_WEIGHTS)
+        for pk in range(1, self.users + 1):
+            role = rnd.choices(roles, weights)[0]
+            yield (pk, f'user{pk}', f'user{pk}@yamdb.fake', role, '', '', '')
+
+    def category_rows(self):
+        for pk in range(1, self.categories + 1):
+            yield pk, f'Категория {pk}', f'category-{pk}'
+
+    def genre_rows(self):
+        for pk in range(1, self.genres + 1):
+            yield pk, f'Жанр {pk}', f'genre-{pk}'
+
+    def titles_rows(self):
+        rnd = self.random('titles')
+        texts = self.texts
+        for pk in range(1, self.titles + 1):
+            yield (
+                pk, f'{rnd.choice(texts)[:40]} {pk}',
+                rnd.randint(1900, FIRST_PUB_DATE.year + 8),
+                rnd.randint(1, self.categories), rnd.choice(texts),
+            )
+
+    def genre_title_rows(self):
+        rnd = self.random('genre_title')
+        pk = 0
+        for title_id in range(1, self.titles + 1):
+            count = rnd.randint(1, self.genres_per_title)
+            for genre_id in rnd.sample(range(1, self.genres + 1), count):
+                pk += 1
+                yield pk, title_id, genre_id
+
+    def review_rows(self):
+        """Отзывы: число на произведение по Ципфу, авторы без повторов."""
+        rnd = self.random('review')
+        counts = zipf_counts(
+            self.reviews, self.titles, self.skew, self.users, rnd
+        )
+        texts, pub_date = self.texts, self.pub_date
+        low, high = SCORE_VALIDATOR_MIN_VALUE, SCORE_VALIDATOR_MAX_VALUE
+        pk = 0
+        for title_id, count in enumerate(counts, 1):
+            quality = rnd.uniform(low + 2, high - 1)
+            for author in rnd.sample(range(1, self.users + 1), count):
+                pk += 1
+                score = min(high, max(low, round(rnd.gauss(quality, 1.5))))
+                yield (pk, title_id, texts[pk % TEXT_POOL_SIZE], author,
+                       score, pub_date(rnd))
+
+    def comments_rows(self):
+        """Комментарии: отзыв выбирается по Ципфу, автор — равномерно."""
+        if not self.reviews:
+            return
+        rnd = self.random('comments')
+        review = ZipfSampler(self.reviews, self.skew, rnd)
+        texts, pub_date, users = self.texts, self.pub_date, self.users
+        for pk in range(1, self.comments + 1):
+            yield (pk, review(), texts[-pk % TEXT_POOL_SIZE],
+                   rnd.randint(1, users), pub_date(rnd))
@@ -0,0 +1,24 @@
+"""Общие функции скриптов замеров."""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    sys.path.insert(0, os.path.join(BASE_DIR, 'api_yamdb'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+    import django
+
+    django.setup()
+
+
+def fresh_database(path):
+    """Переключает базу default на новый файл SQLite и применяет миграции."""
+    from django.core.management import call_command
+    from django.db import connections
+
+    connections.close_all()
+    connections['default'].settings_dict['NAME'] = path
+    call_command('migrate', verbosity=0)
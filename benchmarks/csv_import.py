@@ -0,0 +1,64 @@
+"""Сравнение последовательной и параллельной загрузки csv_db.
+
+Каждый вариант загружает один и тот же набор файлов в отдельную свежую
+базу SQLite во временном каталоге:
+
+    python benchmarks/csv_import.py --reviews 300000 --workers 4
+
+С --path используется готовый каталог с файлами .csv.
+"""
+import argparse
+import os
+import tempfile
+import time
+from io import StringIO
+
+from common import fresh_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', help='Каталог с готовыми файлами .csv.')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--titles', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=300000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, 'data')
+            os.mkdir(path)
+            call_command('generate_db', path=path, users=args.users,
+                         titles=args.titles, reviews=args.reviews,
+                         comments=args.reviews, stdout=StringIO())
+
+        variants = (
+            ('последовательно', {}),
+            (f'{args.workers} процесса(ов)', {'workers': args.workers}),
+            ('последовательно --fast', {'fast': True}),
+            (f'{args.workers} процесса(ов) --fast',
+             {'workers': args.workers, 'fast': True}),
+        )
+        results = []
+        for number, (name, options) in enumerate(variants):
+            fresh_database(os.path.join(tmp, f'bench{number}.sqlite3'))
+            started = time.monotonic()
+            call_command('csv_db', path=path, batch_size=args.batch_size,
+                         stdout=StringIO(), **options)
+            results.append((name, time.monotonic() - started))
+
+    baseline = results[0][1]
+    print(f'{"вариант":<32}{"время, с":>10}{"ускорение":>11}')
+    for name, elapsed in results:
+        print(f'{name:<32}{elapsed:>10.2f}{baseline / elapsed:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Замеры задержки, числа запросов к базе и размера ответов API.
+
+Для каждого масштаба (числа отзывов) создается свежая база SQLite с
+синтетическим набором generate_db, затем каждый сценарий выполняется
+через тестовый клиент Django. Результаты сохраняются в JSON; с
+--compare выводится сравнение с прошлым запуском:
+
+    python benchmarks/endpoints.py --scales 10000 100000 --output new.json
+    python benchmarks/endpoints.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+
+from common import BASE_DIR, fresh_database, setup_django
+
+PERCENTILES = (50, 95, 99)
+
+
+def scale_counts(reviews):
+    """Размеры набора для заданного числа отзывов."""
+    return {
+        'users': max(50, reviews // 10),
+        'titles': max(20, reviews // 40),
+        'reviews': reviews,
+        'comments': reviews // 2,
+    }
+
+
+def scenarios(targets):
+    """Сценарии: имя -> (метод, адрес, данные, клиент).
+
+    Данные могут быть функцией номера повтора, чтобы, например, каждая
+    регистрация создавала нового пользователя.
+    """
+    title, review = targets['title'], targets['review']
+    titles = '/api/v1/titles/'
+    reviews = f'{titles}{title}/reviews/'
+    comments = f'{reviews}{review}/comments/'
+    return {
+        'titles-list': ('get', titles, None, 'anon'),
+        'titles-list-offset': (
+            'get', titles, {'offset': targets['titles'] // 2}, 'anon'
+        ),
+        'titles-detail': ('get', f'{titles}{title}/', None, 'anon'),
+        'titles-filter-genre': ('get', titles, {'genre': 'genre-1'}, 'anon'),
+        'titles-filter-category-year': (
+            'get', titles, {'category': 'category-1', 'year': 2000}, 'anon'
+        ),
+        'titles-search': ('get', titles, {'search': 'фильм'}, 'anon'),
+        'titles-order-name': ('get', titles, {'ordering': 'name'}, 'anon'),
+        'titles-order-year': ('get', titles, {'ordering': '-year'}, 'anon'),
+        'reviews-list': ('get', reviews, None, 'anon'),
+        'reviews-list-cursor': ('get', reviews, {'cursor': ''}, 'anon'),
+        'reviews-list-offset': (
+            'get', reviews, {'offset': targets['title_reviews'] // 2}, 'anon'
+        ),
+        'reviews-detail': ('get', f'{reviews}{review}/', None, 'anon'),
+        'comments-list': ('get', comments, None, 'anon'),
+        'users-search': ('get', '/api/v1/users/', {'search': 'user1'},
+                         'admin'),
+        'users-me': ('get', '/api/v1/users/me/', None, 'user'),
+        'auth-signup': ('post', '/api/v1/auth/signup/', lambda number: {
+            'username': f'bench{number}',
+            'email': f'bench{number}@yamdb.fake',
+        }, 'anon'),
+        'auth-token': ('post', '/api/v1/auth/token/', {
+            'username': targets['username'],
+            'confirmation_code': targets['confirmation_code'],
+        }, 'anon'),
+    }
+
+
+def prepare(counts, seed):
+    """Заполняет базу и выбирает объекты и клиентов для сценариев."""
+    from django.contrib.auth.tokens import default_token_generator
+    from django.core.management import call_command
+    from django.db.models import Count
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from reviews.models import ADMIN, Review, Title, User
+
+    call_command('generate_db', seed=seed, stdout=StringIO(), **counts)
+    title = Title.objects.annotate(
+        reviews_count=Count('reviews')
+    ).order_by('-reviews_count').values_list('pk', 'reviews_count')[0]
+    review = Review.objects.filter(title_id=title[0]).annotate(
+        comments_count=Count('comments')
+    ).order_by('-comments_count').values_list('pk', flat=True)[0]
+    admin = User.objects.create(
+        username='benchadmin', email='benchadmin@yamdb.fake', role=ADMIN
+    )
+    user = User.objects.get(pk=1)
+    clients = {'anon': Client()}
+    for name, account in (('admin', admin), ('user', user)):
+        clients[name] = Client(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(account)}'
+        )
+    targets = {
+        'title': title[0],
+        'title_reviews': title[1],
+        'review': review,
+        'titles': counts['titles'],
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    }
+    return targets, clients
+
+
+def call(client, method, url, data):
+    if method == 'get':
+        return client.get(url, data)
+    return client.post(url, data, content_type='application/json')
+
+
+def measure(client, method, url, data, requests, warmup, counter):
+    """Задержки в мс, статусы, число запросов к базе и размер ответа."""
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    payload = data if callable(data) else (lambda number: data)
+    for _ in range(warmup):
+        call(client, method, url, payload(next(counter)))
+    # Обработчик request_started очищает журнал запросов: отсчет должен
+    # начинаться с пустого журнала, а число — сниматься до следующего запроса.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response = call(client, method, url, payload(next(counter)))
+    query_count, size = len(queries), len(response.content)
+    latencies, statuses = [], set()
+    for _ in range(requests):
+        number = next(counter)
+        started = time.perf_counter()
+        response = call(client, method, url, payload(number))
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses.add(response.status_code)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    result = {
+        f'p{percentile}_ms': round(cuts[percentile - 1], 3)
+        for percentile in PERCENTILES
+    }
+    result.update(
+        mean_ms=round(statistics.fmean(latencies), 3),
+        queries=query_count,
+        bytes=size,
+        status=sorted(statuses),
+    )
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run(args):
+    from itertools import count
+
+    from django.conf import settings
+
+    # Замеры без журнала SQL режима DEBUG и без отправки писем.
+    settings.DEBUG = False
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    counter = count()
+    results = {'environment': environment(), 'scales': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            fresh_database(os.path.join(tmp, f'bench{scale}.sqlite3'))
+            counts = scale_counts(scale)
+            targets, clients = prepare(counts, args.seed)
+            endpoints = {}
+            for name, (method, url, data, client) in scenarios(
+                targets
+            ).items():
+                if args.only and not any(
+                    name.startswith(prefix) for prefix in args.only
+                ):
+                    continue
+                endpoints[name] = measure(
+                    clients[client], method, url, data, args.requests,
+                    args.warmup, counter
+                )
+                print(f'{scale:>9} {name:<30}'
+                      f'{endpoints[name]["p50_ms"]:>9.2f} мс'
+                      f'{endpoints[name]["queries"]:>4} запр.',
+                      file=sys.stderr)
+            results['scales'][str(scale)] = {
+                'counts': counts, 'endpoints': endpoints,
+            }
+    return results
+
+
+def compare(old, new, threshold):
+    """Печатает изменения p50/p95 и числа запросов; возвращает регрессии."""
+    regressions = []
+    print(f'{"масштаб":>9} {"сценарий":<30}{"p50, мс":>18}{"p95, мс":>18}'
+          f'{"запросы":>10}')
+    for scale, data in new['scales'].items():
+        before = old['scales'].get(scale, {}).get('endpoints', {})
+        for name, result in data['endpoints'].items():
+            if name not in before:
+                continue
+            cells = []
+            for key in ('p50_ms', 'p95_ms'):
+                change = result[key] / before[name][key] - 1
+                cells.append(
+                    f'{before[name][key]:>7.2f}→{result[key]:<7.2f}'
+                    f'{change:>+4.0%}'
+                )
+                if key == 'p50_ms' and change > threshold:
+                    regressions.append((scale, name, key, change))
+            queries = f'{before[name]["queries"]}→{result["queries"]}'
+            if result['queries'] > before[name]['queries']:
+                regressions.append((scale, name, 'queries', None))
+            print(f'{scale:>9} {name:<30}{cells[0]:>18}{cells[1]:>18}'
+                  f'{queries:>10}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000],
+                        help='Число отзывов в наборе для каждого масштаба.')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='Число замеряемых запросов на сценарий.')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='+',
+                        help='Только сценарии с этими префиксами имен.')
+    parser.add_argument('--output', default='endpoints.json')
+    parser.add_argument('--compare', help='JSON прошлого запуска.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Допустимый рост p50 при сравнении.')
+    args = parser.parse_args()
+
+    setup_django()
+    results = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for scale, name, key, change in regressions:
+            detail = f'{change:+.0%}' if change is not None else 'больше'
+            print(f'Регрессия: {scale} {name} {key} {detail}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,466 @@
+"""Нагрузочный прогон запросов коллекции Postman.
+
+Коллекция postman_collection/ сначала выполняется один раз по порядку, как
+в Postman: создаются пользователи set_up_data.sh, коды подтверждения
+вычисляются после регистрации, а переменные ({{adminToken}}, {{adminTitle}}
+и др.) заполняются из ответов по правилам тестовых скриптов. Затем
+выбранные запросы повторяются N виртуальными пользователями одновременно;
+для каждого запроса выводятся пропускная способность, перцентили и
+гистограмма задержек.
+
+По умолчанию запросы выполняет тестовый клиент Django на свежей базе
+SQLite; с --base-url — HTTP-клиент к запущенному серверу, работающему с
+базой из настроек проекта (--setup очищает ее, как set_up_data.sh):
+
+    python benchmarks/postman_replay.py --users 8 --duration 30
+    python benchmarks/postman_replay.py --base-url http://127.0.0.1:8000 \\
+        --setup --users 8 --iterations 20 --output replay.json
+"""
+import argparse
+import copy
+import http.client
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+from common import BASE_DIR, fresh_database, setup_django
+
+COLLECTION = os.path.join(
+    BASE_DIR, 'postman_collection', 'Ymdb-collection.postman_collection.json'
+)
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+PERCENTILES = (50, 95, 99)
+PASSWORD = '5eCretPaSsw0rD'
+SETUP_USERS = (
+    ('superuser', 'superuser@admin.ru', 'user', True),
+    ('admin-user', 'admin-user@admin.ru', 'admin', False),
+    ('moderator', 'moderator@admin.ru', 'moderator', False),
+)
+CLEANUP_FOLDER = 'delete_requests'
+VARIABLE = re.compile(r'{{(\w+)}}')
+SCRIPT_GET = re.compile(
+    r'const (\w+) = _\.get\(responseData, ["\']([\w.]+)["\']\)'
+)
+SCRIPT_SET = re.compile(r'collectionVariables\.set\("(\w+)", (\w+)\)')
+
+
+class Request:
+    """Запрос коллекции и правила заполнения переменных из ответа."""
+
+    def __init__(self, folder, item):
+        request = item['request']
+        self.folder = folder
+        self.name = item['name']
+        self.method = request['method']
+        self.url = request['url']['raw']
+        self.body = request.get('body', {}).get('raw')
+        self.headers = {
+            header['key']: header['value']
+            for header in request.get('header', [])
+            if not header.get('disabled')
+        }
+        self.token = None
+        auth = request.get('auth', {})
+        if auth.get('type') == 'bearer':
+            self.token = next(
+                entry['value'] for entry in auth['bearer']
+                if entry['key'] == 'token'
+            )
+        self.extract = []
+        for event in item.get('event', []):
+            if event['listen'] != 'test':
+                continue
+            script = '\n'.join(event['script']['exec'])
+            paths = dict(SCRIPT_GET.findall(script))
+            self.extract.extend(
+                (variable, paths[local])
+                for variable, local in SCRIPT_SET.findall(script)
+                if local in paths
+            )
+
+    @property
+    def path(self):
+        return '/'.join(self.folder + (self.name,))
+
+    def resolve(self, variables):
+        """Метод, адрес, тело и заголовки с подставленными переменными."""
+        def substitute(text):
+            return VARIABLE.sub(
+                lambda match: str(variables.get(match[1], match[0])), text
+            )
+
+        url = urlsplit(substitute(self.url))
+        path = url.path + (f'?{url.query}' if url.query else '')
+        headers = {
+            key: substitute(value) for key, value in self.headers.items()
+        }
+        if self.token:
+            headers['Authorization'] = f'Bearer {substitute(self.token)}'
+        body = substitute(self.body) if self.body else None
+        return self.method, path, body, headers
+
+    def update(self, variables, status, data):
+        """Заполняет переменные из ответа, как тестовый скрипт запроса.
+
+        В скриптах переменные задаются после проверки статуса, поэтому
+        ответы с ошибками пропускаются.
+        """
+        if status >= 300 or not isinstance(data, dict):
+            return
+        for variable, path in self.extract:
+            value = data
+            for key in path.split('.'):
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                variables[variable] = value
+
+
+def load_collection(path):
+    """Переменные коллекции и запросы в порядке выполнения Postman."""
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    def walk(items, folder):
+        for item in items:
+            if 'item' in item:
+                yield from walk(item['item'], folder + (item['name'],))
+            else:
+                yield Request(folder, item)
+
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', [])
+    }
+    return variables, list(walk(collection['item'], ()))
+
+
+def report_names(requests):
+    """Имена для отчета; повторяющиеся имена дополняются папкой."""
+    counts = Counter(request.name for request in requests)
+    return {
+        request.path: (
+            request.name if counts[request.name] == 1
+            else f'{request.folder[-1]}/{request.name}'
+        )
+        for request in requests
+    }
+
+
+class ClientTransport:
+    """Запросы через тестовый клиент Django, по клиенту на поток."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def send(self, method, path, body, headers):
+        from django.test import Client
+
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        extra = {
+            'HTTP_' + key.upper().replace('-', '_'): value
+            for key, value in headers.items()
+        }
+        response = self.local.client.generic(
+            method, path, body or '', content_type='application/json',
+            **extra
+        )
+        return response.status_code, response.content
+
+    def close(self):
+        from django.db import connections
+
+        connections.close_all()
+
+
+class HTTPTransport:
+    """Запросы к запущенному серверу; соединение на поток сохраняется."""
+
+    def __init__(self, base_url):
+        self.base_url = urlsplit(base_url)
+        self.local = threading.local()
+
+    def send(self, method, path, body, headers):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = http.client.HTTPConnection(
+                self.base_url.hostname, self.base_url.port or 80, timeout=30
+            )
+        connection = self.local.connection
+        path = quote(path, safe='/?&=%:,+')
+        headers = {'Content-Type': 'application/json', **headers}
+        try:
+            connection.request(
+                method, path, body.encode() if body else None, headers
+            )
+            response = connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Сервер мог закрыть соединение между запросами: повторяем
+            # один раз на новом соединении.
+            connection.close()
+            connection.request(
+                method, path, body.encode() if body else None, headers
+            )
+            response = connection.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        if hasattr(self.local, 'connection'):
+            self.local.connection.close()
+
+
+def setup_users():
+    """Очищает базу и создает пользователей, как set_up_data.sh."""
+    from django.core.management import call_command
+
+    from reviews.models import User
+
+    call_command('migrate', verbosity=0)
+    call_command('flush', interactive=False, verbosity=0)
+    for username, email, role, superuser in SETUP_USERS:
+        user = User(
+            username=username, email=email, role=role,
+            is_superuser=superuser, is_staff=superuser
+        )
+        user.set_password(PASSWORD)
+        user.save()
+
+
+def confirmation_codes(variables):
+    """Коды подтверждения для переменных вида <роль>ConfirmationCode."""
+    from django.contrib.auth.tokens import default_token_generator
+
+    from reviews.models import User
+
+    for variable in list(variables):
+        prefix, found, _ = variable.partition('ConfirmationCode')
+        username = variables.get(f'{prefix}Username')
+        if not found or username is None:
+            continue
+        user = User.objects.filter(username=username).first()
+        if user is not None:
+            variables[variable] = default_token_generator.make_token(user)
+
+
+def prime(transport, variables, requests):
+    """Выполняет коллекцию один раз по порядку, заполняя переменные.
+
+    Запросы папки delete_requests пропускаются, чтобы созданные коллекцией
+    объекты остались для нагрузочного прогона. Возвращает статусы ответов.
+    """
+    statuses = Counter()
+    codes_ready = False
+    for request in requests:
+        if request.folder[0] == CLEANUP_FOLDER:
+            continue
+        if not codes_ready and '/auth/token/' in request.url:
+            confirmation_codes(variables)
+            codes_ready = True
+        status, content = transport.send(*request.resolve(variables))
+        statuses[status] += 1
+        try:
+            request.update(variables, status, json.loads(content))
+        except ValueError:
+            pass
+    return statuses
+
+
+def virtual_user(transport, variables, requests, iterations, deadline,
+                 samples):
+    """Повторяет запросы по порядку и собирает (путь, статус, мс)."""
+    variables = copy.deepcopy(variables)
+    iteration = 0
+    try:
+        while iteration < iterations and time.monotonic() < deadline:
+            for request in requests:
+                prepared = request.resolve(variables)
+                started = time.perf_counter()
+                status, _ = transport.send(*prepared)
+                samples.append((
+                    request.path, status,
+                    (time.perf_counter() - started) * 1000,
+                ))
+            iteration += 1
+    finally:
+        transport.close()
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies.sort()
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    else:
+        cuts = latencies * 99
+    histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    bucket = 0
+    for latency in latencies:
+        while bucket < len(LATENCY_BUCKETS) and (
+            latency > LATENCY_BUCKETS[bucket]
+        ):
+            bucket += 1
+        histogram[bucket] += 1
+    result = {
+        'count': len(latencies),
+        'rps': round(len(latencies) / elapsed, 2),
+    }
+    result.update(
+        (f'p{percentile}_ms', round(cuts[percentile - 1], 3))
+        for percentile in PERCENTILES
+    )
+    result.update(
+        max_ms=round(latencies[-1], 3),
+        status=dict(sorted(Counter(statuses).items())),
+        histogram=histogram,
+    )
+    return result
+
+
+def replay(transport, variables, requests, args):
+    samples = []
+    deadline = time.monotonic() + (args.duration or float('inf'))
+    iterations = args.iterations if not args.duration else float('inf')
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(transport, variables, requests, iterations, deadline,
+                  samples),
+        )
+        for _ in range(args.users)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    names = report_names(requests)
+    grouped = {request.path: ([], []) for request in requests}
+    for path, status, latency in samples:
+        grouped[path][0].append(latency)
+        grouped[path][1].append(status)
+    return {
+        'users': args.users,
+        'elapsed_s': round(elapsed, 3),
+        'buckets_ms': list(LATENCY_BUCKETS),
+        'total': summarize(
+            [latency for *_, latency in samples],
+            [status for _, status, _ in samples], elapsed
+        ),
+        'requests': {
+            names[path]: summarize(latencies, statuses, elapsed)
+            for path, (latencies, statuses) in grouped.items()
+            if latencies
+        },
+    }
+
+
+def select(requests, args):
+    methods = {method.upper() for method in args.methods}
+    return [
+        request for request in requests
+        if request.method in methods
+        and (not args.folders or any(
+            request.path.startswith(folder) for folder in args.folders
+        ))
+    ]
+
+
+def print_report(results):
+    print(f'Виртуальных пользователей: {results["users"]}, '
+          f'{results["total"]["count"]} запросов за '
+          f'{results["elapsed_s"]:.1f} с, '
+          f'{results["total"]["rps"]:.1f} запр./с')
+    rows = dict(results['requests'], **{'ВСЕГО': results['total']})
+    width = max(len(name) for name in rows) + 2
+    print(f'{"запрос":<{width}}{"запр./с":>9}{"p50":>8}{"p95":>8}'
+          f'{"p99":>8}{"max":>8}  статусы')
+    for name, row in rows.items():
+        statuses = ' '.join(
+            f'{status}×{count}' for status, count in row['status'].items()
+        )
+        print(f'{name:<{width}}{row["rps"]:>9.1f}{row["p50_ms"]:>8.1f}'
+              f'{row["p95_ms"]:>8.1f}{row["p99_ms"]:>8.1f}'
+              f'{row["max_ms"]:>8.1f}  {statuses}')
+    print()
+    print('Гистограмма задержек, мс (число запросов не дольше границы):')
+    bounds = [f'≤{bound}' for bound in results['buckets_ms']]
+    bounds.append(f'>{results["buckets_ms"][-1]}')
+    print(f'{"запрос":<{width}}' + ''.join(f'{bound:>7}' for bound in bounds))
+    for name, row in rows.items():
+        print(f'{name:<{width}}'
+              + ''.join(f'{count:>7}' for count in row['histogram']))
+
+
+def run(args):
+    from django.conf import settings
+
+    variables, requests = load_collection(args.collection)
+    selected = select(requests, args)
+    if not selected:
+        sys.exit('Нет запросов, подходящих под --methods и --folders.')
+    if args.base_url:
+        transport = HTTPTransport(args.base_url)
+        if args.setup:
+            setup_users()
+        statuses = prime(transport, variables, requests)
+        print(f'Подготовка: {dict(sorted(statuses.items()))}',
+              file=sys.stderr)
+        return replay(transport, variables, selected, args)
+
+    # Прогон без журнала SQL режима DEBUG и без отправки писем.
+    settings.DEBUG = False
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    transport = ClientTransport()
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh_database(os.path.join(tmp, 'replay.sqlite3'))
+        setup_users()
+        statuses = prime(transport, variables, requests)
+        print(f'Подготовка: {dict(sorted(statuses.items()))}',
+              file=sys.stderr)
+        results = replay(transport, variables, selected, args)
+        transport.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--collection', default=COLLECTION)
+    parser.add_argument('--users', type=int, default=4,
+                        help='Число одновременных виртуальных пользователей.')
+    parser.add_argument('--iterations', type=int, default=10,
+                        help='Число проходов по запросам на пользователя.')
+    parser.add_argument('--duration', type=float,
+                        help='Длительность прогона в секундах вместо '
+                             '--iterations.')
+    parser.add_argument('--methods', nargs='+', default=['GET'],
+                        help='Методы повторяемых запросов; запросы на '
+                             'изменение конфликтуют между пользователями.')
+    parser.add_argument('--folders', nargs='+',
+                        help='Только запросы из папок с этими префиксами '
+                             'пути, например titles/get_titles_info.')
+    parser.add_argument('--base-url',
+                        help='Адрес запущенного сервера вместо тестового '
+                             'клиента.')
+    parser.add_argument('--setup', action='store_true',
+                        help='С --base-url: очистить базу из настроек и '
+                             'создать пользователей, как set_up_data.sh.')
+    parser.add_argument('--output', help='Сохранить результаты в JSON.')
+    args = parser.parse_args()
+
+    setup_django()
+    results = run(args)
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
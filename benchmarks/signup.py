@@ -0,0 +1,141 @@
+"""Скорость регистрации и создания пользователей.
+
+На свежей базе SQLite замеряются регистрация через
+`POST /api/v1/auth/signup/`, создание пользователя через ORM (как в
+админке и при выдаче учетных записей) и массовое создание через
+bulk_create (как в csv_db). Для каждого сценария выводятся пользователи в
+секунду, p50/p99 и число записывающих SQL-запросов на пользователя, а для
+массового создания — доля пользователей с действительным кодом
+подтверждения:
+
+    python benchmarks/signup.py --users 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from common import fresh_database, setup_django
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class WriteCounter:
+    """Обертка выполнения SQL, считающая записывающие запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITES):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def summarize(latencies, elapsed, writes, users):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'per_second': round(users / elapsed, 1),
+        'p50_ms': round(cuts[49], 3),
+        'p99_ms': round(cuts[98], 3),
+        'writes_per_user': round(writes / users, 2),
+    }
+
+
+def measure(create, users):
+    """Вызывает create(number) для каждого пользователя и замеряет время."""
+    from django.db import connection
+
+    counter = WriteCounter()
+    latencies = []
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        for number in range(users):
+            call_started = time.perf_counter()
+            create(number)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, counter.count, users)
+
+
+def signup(client):
+    def create(number):
+        response = client.post('/api/v1/auth/signup/', {
+            'email': f'signup{number}@yamdb.fake',
+            'username': f'signup{number}',
+        })
+        assert response.status_code == 200, response.content
+    return create
+
+
+def orm_create(number):
+    from reviews.models import User
+
+    User.objects.create(
+        username=f'created{number}', email=f'created{number}@yamdb.fake'
+    )
+
+
+def bulk_create(users, batch_size):
+    """Массовое создание и проверка кодов подтверждения новых пользователей."""
+    from django.contrib.auth.tokens import default_token_generator
+    from django.db import connection
+
+    from reviews.models import User
+
+    counter = WriteCounter()
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            (User(username=f'bulk{number}', email=f'bulk{number}@yamdb.fake')
+             for number in range(users)),
+            batch_size=batch_size,
+        )
+        elapsed = time.perf_counter() - started
+    valid = sum(
+        default_token_generator.check_token(user, user.confirmation_code)
+        for user in User.objects.filter(username__startswith='bulk')
+    )
+    return {
+        'per_second': round(users / elapsed, 1),
+        'writes_per_user': round(counter.count / users, 4),
+        'valid_codes': round(valid / users, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--output', help='Сохранить результаты в JSON.')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+
+    settings.DEBUG = False
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh_database(os.path.join(tmp, 'signup.sqlite3'))
+        results = {
+            'signup': measure(signup(Client()), args.users),
+            'orm_create': measure(orm_create, args.users),
+            'bulk_create': bulk_create(args.users, args.batch_size),
+        }
+
+    print(f'{"сценарий":<14}{"в секунду":>11}{"p50, мс":>10}{"p99, мс":>10}'
+          f'{"записей":>9}{"коды":>7}')
+    for name, row in results.items():
+        print(f'{name:<14}{row["per_second"]:>11}'
+              f'{row.get("p50_ms", "-"):>10}{row.get("p99_ms", "-"):>10}'
+              f'{row["writes_per_user"]:>9}{row.get("valid_codes", "-"):>7}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
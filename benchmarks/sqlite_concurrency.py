@@ -0,0 +1,222 @@
+"""Чтение API во время интенсивной записи отзывов при разных профилях SQLite.
+
+Для каждого профиля создается свежая база с синтетическим набором, затем
+в течение --duration секунд процессы-читатели запрашивают списки
+произведений и отзывов, а процессы-писатели создают и удаляют отзывы —
+как рабочие процессы сервера с предварительным fork.
+Профиль default — настройки SQLite по умолчанию и новое соединение на
+запрос; production — DATABASE_PROFILE=production (WAL, PRAGMA,
+постоянные соединения, BEGIN IMMEDIATE и повтор при блокировке):
+
+    python benchmarks/sqlite_concurrency.py --readers 4 --writers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import StringIO
+
+from common import fresh_database, setup_django
+
+PROFILES = ('default', 'production')
+
+
+def prepare(args):
+    """Заполняет базу; возвращает адреса чтения и токены писателей."""
+    from django.core.management import call_command
+    from django.db.models import Count
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from reviews.models import Title, User
+
+    call_command(
+        'generate_db', users=args.titles * 2, titles=args.titles,
+        reviews=args.titles * 20, comments=args.titles * 10, seed=1,
+        stdout=StringIO()
+    )
+    title = Title.objects.annotate(
+        reviews_count=Count('reviews')
+    ).order_by('-reviews_count').values_list('pk', flat=True)[0]
+    reads = ('/api/v1/titles/', f'/api/v1/titles/{title}/reviews/')
+    writers = [
+        User.objects.create(
+            username=f'writer{number}', email=f'writer{number}@yamdb.fake'
+        )
+        for number in range(args.writers)
+    ]
+    tokens = [str(AccessToken.for_user(writer)) for writer in writers]
+    titles = list(Title.objects.values_list('pk', flat=True))
+    return reads, tokens, titles
+
+
+def reader(reads, deadline, queue):
+    from django.db import connections
+    from django.test import Client
+
+    # Соединение родителя не должно использоваться после fork.
+    connections.close_all()
+    client = Client(raise_request_exception=False)
+    result = {'latencies': [], 'errors': 0}
+    try:
+        while time.monotonic() < deadline:
+            for url in reads:
+                started = time.perf_counter()
+                response = client.get(url)
+                result['latencies'].append(
+                    (time.perf_counter() - started) * 1000
+                )
+                if response.status_code != 200:
+                    result['errors'] += 1
+    finally:
+        connections.close_all()
+        queue.put(('reads', result))
+
+
+def writer(token, titles, deadline, queue):
+    """Создает и удаляет отзывы, обходя произведения по кругу."""
+    from django.db import connections
+    from django.test import Client
+
+    connections.close_all()
+    result = {'latencies': [], 'errors': 0}
+    client = Client(
+        raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {token}'
+    )
+    number = 0
+    try:
+        while time.monotonic() < deadline:
+            url = f'/api/v1/titles/{titles[number % len(titles)]}/reviews/'
+            number += 1
+            started = time.perf_counter()
+            response = client.post(
+                url, {'text': 'Отзыв под нагрузкой', 'score': 7},
+                content_type='application/json'
+            )
+            result['latencies'].append(
+                (time.perf_counter() - started) * 1000
+            )
+            if response.status_code != 201:
+                result['errors'] += 1
+                continue
+            started = time.perf_counter()
+            response = client.delete(f'{url}{response.json()["id"]}/')
+            result['latencies'].append(
+                (time.perf_counter() - started) * 1000
+            )
+            if response.status_code != 204:
+                result['errors'] += 1
+    finally:
+        connections.close_all()
+        queue.put(('writes', result))
+
+
+def summarize(results, elapsed):
+    latencies = sorted(
+        latency for result in results for latency in result['latencies']
+    )
+    if len(latencies) < 2:
+        return {'count': len(latencies), 'errors': sum(
+            result['errors'] for result in results
+        )}
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'count': len(latencies),
+        'per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(cuts[49], 2),
+        'p99_ms': round(cuts[98], 2),
+        'max_ms': round(latencies[-1], 2),
+        'errors': sum(result['errors'] for result in results),
+    }
+
+
+def run_profile(profile, path, args):
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    from reviews.database import configure_sqlite
+
+    fresh_database(path)
+    reads, tokens, titles = prepare(args)
+    connections.close_all()
+    production = profile == 'production'
+    settings_dict = connections['default'].settings_dict
+    settings_dict['CONN_MAX_AGE'] = 600 if production else 0
+    if production:
+        connection_created.connect(configure_sqlite)
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    deadline = time.monotonic() + args.duration
+    processes = [
+        context.Process(target=reader, args=(reads, deadline, queue))
+        for _ in range(args.readers)
+    ] + [
+        context.Process(
+            target=writer,
+            args=(token, titles[number::args.writers], deadline, queue)
+        )
+        for number, token in enumerate(tokens)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = {'reads': [], 'writes': []}
+    for _ in processes:
+        kind, result = queue.get()
+        results[kind].append(result)
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    connection_created.disconnect(configure_sqlite)
+    connections.close_all()
+    settings_dict['CONN_MAX_AGE'] = 0
+    return {
+        kind: summarize(kind_results, elapsed)
+        for kind, kind_results in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--titles', type=int, default=500,
+                        help='Число произведений; отзывов — в 20 раз больше.')
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES,
+                        default=list(PROFILES))
+    parser.add_argument('--output', help='Сохранить результаты в JSON.')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    settings.DEBUG = False
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles:
+            results[profile] = run_profile(
+                profile, os.path.join(tmp, f'{profile}.sqlite3'), args
+            )
+            print(f'{profile} готов', file=sys.stderr)
+
+    print(f'{"профиль":<12}{"операции":<10}{"в секунду":>10}{"p50, мс":>9}'
+          f'{"p99, мс":>9}{"max, мс":>9}{"ошибки":>8}')
+    for profile, result in results.items():
+        for kind in ('reads', 'writes'):
+            row = result[kind]
+            print(f'{profile:<12}{kind:<10}{row.get("per_second", 0):>10}'
+                  f'{row.get("p50_ms", 0):>9}{row.get("p99_ms", 0):>9}'
+                  f'{row.get("max_ms", 0):>9}{row["errors"]:>8}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
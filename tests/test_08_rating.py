@@ -0,0 +1,102 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08RatingAPI:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json().get('rating')
+
+    def test_01_rating_follows_reviews(self, admin_client, user_client,
+                                       moderator_client, user):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+
+        create_single_review(admin_client, title_id, 'Отлично', 9)
+        response = create_single_review(user_client, title_id, 'Так себе', 3)
+        review_id = response.json()['id']
+        assert self.get_rating(admin_client, title_id) == 6, (
+            'Проверьте, что рейтинг произведения обновляется при создании '
+            'отзыва.'
+        )
+
+        response = user_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+            data={'score': 7}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(admin_client, title_id) == 8, (
+            'Проверьте, что рейтинг произведения обновляется при изменении '
+            'оценки отзыва.'
+        )
+
+        response = create_single_review(
+            moderator_client, title_id, 'Неплохо', 5
+        )
+        response = moderator_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=response.json()['id']
+            )
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(admin_client, title_id) == 8, (
+            'Проверьте, что рейтинг произведения обновляется при удалении '
+            'отзыва.'
+        )
+
+        user.delete()
+        assert self.get_rating(admin_client, title_id) == 9, (
+            'Проверьте, что рейтинг произведения обновляется при каскадном '
+            'удалении отзывов вместе с автором.'
+        )
+
+        response = admin_client.get(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+        )
+        for review in response.json()['results']:
+            admin_client.delete(
+                self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                    title_id=title_id, review_id=review['id']
+                )
+            )
+        assert self.get_rating(admin_client, title_id) is None, (
+            'Если у произведения не осталось отзывов - значением поля '
+            '`rating` должено быть `None`.'
+        )
+
+    def test_02_rating_db_command(self, admin_client, user_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Хорошо', 8)
+
+        Title.objects.filter(pk=title_id).update(
+            score_sum=0, score_count=0, rating=None
+        )
+        with pytest.raises(CommandError):
+            call_command('rating_db', '--check')
+
+        call_command('rating_db')
+        call_command('rating_db', '--check')
+        assert self.get_rating(admin_client, title_id) == 8, (
+            'Проверьте, что команда `rating_db` пересчитывает сохраненный '
+            'рейтинг произведений.'
+        )
@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09KeysetPaginationAPI:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def walk(self, client, url):
+        response = client.get(url, {'cursor': '', 'limit': 2})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            f'Проверьте, что курсорная пагинация `{url}` не выполняет '
+            'подсчет всех записей.'
+        )
+        assert data['previous'] is None
+        pages = [data]
+        while data['next']:
+            response = client.get(data['next'])
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            pages.append(data)
+        return pages
+
+    def test_01_reviews_and_comments_cursor(self, admin_client, admin, user,
+                                            user_client, moderator,
+                                            moderator_client):
+        authors_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        }
+        comments, reviews, titles = create_comments(admin_client, authors_map)
+        urls = (
+            (
+                self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id']),
+                reviews,
+            ),
+            (
+                self.COMMENTS_URL_TEMPLATE.format(
+                    title_id=titles[0]['id'], review_id=reviews[0]['id']
+                ),
+                comments,
+            ),
+        )
+        for url, objects in urls:
+            pages = self.walk(admin_client, url)
+            ids = [obj['id'] for page in pages for obj in page['results']]
+            assert ids == sorted(obj['id'] for obj in objects)[::-1], (
+                f'Проверьте, что курсорная пагинация `{url}` возвращает все '
+                'записи по одному разу в порядке убывания даты публикации.'
+            )
+            assert [len(page['results']) for page in pages] == [2, 1]
+
+            response = admin_client.get(pages[-1]['previous'])
+            assert [obj['id'] for obj in response.json()['results']] == (
+                ids[:2]
+            ), (
+                f'Проверьте, что ссылка `previous` курсорной пагинации '
+                f'`{url}` возвращает предыдущую страницу.'
+            )
+
+            response = admin_client.get(url, {'limit': 2, 'offset': 2})
+            assert response.json()['count'] == len(objects), (
+                f'Проверьте, что `{url}` по-прежнему поддерживает пагинацию '
+                '`limit`/`offset`.'
+            )
+
+        response = admin_client.get(urls[0][0], {'cursor': 'broken'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import check_max_queries, create_comments, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10QueriesAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLES_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def create_more_titles(self, admin_client, genres, categories, count):
+        for idx in range(count):
+            response = admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {idx}',
+                'year': 2000,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % len(categories)]['slug'],
+            })
+            assert response.status_code == HTTPStatus.CREATED
+
+    def test_01_titles_list_queries(self, admin_client, client):
+        _, categories, genres = create_titles(admin_client)
+        check_max_queries(client, 'get', self.TITLES_URL, 3)
+
+        self.create_more_titles(admin_client, genres, categories, 10)
+        check_max_queries(client, 'get', self.TITLES_URL, 3)
+        check_max_queries(
+            client, 'get', f'{self.TITLES_URL}?genre=comedy&ordering=year', 3
+        )
+
+    def test_02_title_detail_and_create_queries(self, admin_client, client):
+        titles, categories, genres = create_titles(admin_client)
+        check_max_queries(
+            client, 'get',
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            2
+        )
+        check_max_queries(
+            admin_client, 'post', self.TITLES_URL, 7,
+            data={
+                'name': 'Чужой',
+                'year': 1979,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[0]['slug'],
+            },
+            expected_status=HTTPStatus.CREATED
+        )
+
+    def test_03_reviews_and_comments_queries(self, admin_client, admin, user,
+                                             user_client, moderator_client,
+                                             client):
+        authors_map = {
+            admin: admin_client,
+            user: user_client,
+        }
+        _, reviews, titles = create_comments(admin_client, authors_map)
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        comments_url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        check_max_queries(client, 'get', reviews_url, 2)
+        check_max_queries(client, 'get', comments_url, 2)
+        check_max_queries(
+            client, 'get', f'{reviews_url}{reviews[0]["id"]}/', 1
+        )
+        check_max_queries(
+            client, 'get',
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]['id']), 3
+        )
+        check_max_queries(
+            client, 'get',
+            self.REVIEWS_URL_TEMPLATE.format(title_id=999), 3,
+            expected_status=HTTPStatus.NOT_FOUND
+        )
+        check_max_queries(
+            moderator_client, 'post', reviews_url, 5,
+            data={'text': 'Рецензия', 'score': 7},
+            expected_status=HTTPStatus.CREATED
+        )
+        check_max_queries(
+            moderator_client, 'post', comments_url, 4,
+            data={'text': 'Комментарий'},
+            expected_status=HTTPStatus.CREATED
+        )
@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+from tests.utils import (
+    check_query_plan, create_comments, explain_query_plan
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11IndexesAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_reviews_and_comments_use_indexes(self, admin_client, admin,
+                                                 user, user_client):
+        authors_map = {
+            admin: admin_client,
+            user: user_client,
+        }
+        _, reviews, titles = create_comments(admin_client, authors_map)
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        comments_url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        next_url = admin_client.get(
+            reviews_url, {'cursor': '', 'limit': 1}
+        ).json()['next']
+
+        for url in (reviews_url, f'{reviews_url}?cursor=', next_url):
+            check_query_plan(
+                admin_client, url, 'reviews_review',
+                'review_title_pub_date_idx'
+            )
+        check_query_plan(
+            admin_client, comments_url, 'reviews_comment',
+            'comment_review_pub_date_idx'
+        )
+
+    def test_02_titles_use_indexes(self, admin_client):
+        from reviews.models import GenreTitle, Title
+
+        create_comments(admin_client, {})
+        check_query_plan(
+            admin_client, self.TITLES_URL, 'reviews_title',
+            'title_rating_idx'
+        )
+        check_query_plan(
+            admin_client, f'{self.TITLES_URL}?year=1984', 'reviews_title',
+            'title_year_rating_idx'
+        )
+
+        queries = (
+            (
+                Title.objects.filter(category_id=1).order_by('rating'),
+                'title_category_rating_idx',
+            ),
+            (
+                GenreTitle.objects.filter(genre_id=1).values('title_id'),
+                'genretitle_genre_title_idx',
+            ),
+        )
+        for queryset, index in queries:
+            plan = explain_query_plan(str(queryset.query))
+            assert re.search(rf'INDEX {index}\b', plan), (
+                f'Запрос `{queryset.query}` не использует индекс `{index}`:'
+                f'\n{plan}'
+            )
@@ -0,0 +1,82 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12SearchAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLES_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def search(self, client, value):
+        response = client.get(self.TITLES_URL, {'search': value})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`search` возвращает ответ со статусом 200.'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_search_titles(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+
+        assert self.search(client, 'термин') == ['Терминатор'], (
+            'Проверьте, что параметр `search` ищет произведения по началу '
+            'слова в названии.'
+        )
+        assert self.search(client, 'YIPPIE') == ['Крепкий орешек'], (
+            'Проверьте, что параметр `search` ищет произведения по описанию '
+            'без учета регистра.'
+        )
+        assert self.search(client, '"*:-(') == []
+
+        admin_client.patch(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id']),
+            data={'name': 'Крепкий терминатор'}
+        )
+        response = admin_client.post(self.TITLES_URL, data={
+            'name': 'Терминатор 2',
+            'year': 1991,
+            'genre': titles[0]['genre'],
+            'category': titles[0]['category'],
+            'description': 'Терминатор возвращается',
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        assert self.search(client, 'терминатор') == [
+            'Терминатор 2', 'Терминатор', 'Крепкий терминатор'
+        ], (
+            'Проверьте, что результаты поиска учитывают изменения '
+            'произведений и упорядочены по релевантности.'
+        )
+
+        admin_client.delete(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        )
+        assert self.search(client, 'терминатор') == [
+            'Терминатор 2', 'Крепкий терминатор'
+        ]
+
+    def test_02_single_match_pass(self, admin_client):
+        from django.db import connection
+
+        from reviews.models import Title
+        from reviews.search import TITLE_SEARCH_TABLE, search_titles
+
+        create_titles(admin_client)
+        sql, params = search_titles(
+            Title.objects.all(), 'терминатор'
+        ).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        assert not any('SUBQUERY' in step for step in plan), (
+            'Проверьте, что релевантность читается в том же проходе MATCH, '
+            'а не подзапросом на каждую найденную строку:\n'
+            + '\n'.join(plan)
+        )
+        assert sum(TITLE_SEARCH_TABLE in step for step in plan) == 1, (
+            'Проверьте, что полнотекстовый индекс просматривается один раз:\n'
+            + '\n'.join(plan)
+        )
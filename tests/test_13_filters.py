@@ -0,0 +1,59 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import check_max_queries, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13FiltersAPI:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def filter_names(self, client, query):
+        response = check_max_queries(
+            client, 'get', f'{self.TITLES_URL}?{query}', 3
+        )
+        data = response.json()
+        names = [title['name'] for title in data['results']]
+        assert data['count'] == len(names), (
+            f'Проверьте, что фильтр `{query}` не дублирует произведения.'
+        )
+        return sorted(names)
+
+    def test_01_exact_and_multi_value_filters(self, admin_client, client):
+        create_titles(admin_client)
+        admin_client.post(
+            '/api/v1/genres/', data={'name': 'Мелодрама', 'slug': 'melodrama'}
+        )
+        response = admin_client.post(self.TITLES_URL, data={
+            'name': 'Титаник',
+            'year': 1997,
+            'genre': ['melodrama', 'comedy'],
+            'category': 'films',
+        })
+        assert response.status_code == HTTPStatus.CREATED
+
+        cases = (
+            ('genre=drama', ['Крепкий орешек']),
+            ('genre=horror,drama', ['Крепкий орешек', 'Терминатор']),
+            ('genre=comedy,melodrama', ['Терминатор', 'Титаник']),
+            ('genre=horror,comedy&genre_match=all', ['Терминатор']),
+            ('genre=horror,drama&genre_match=all', []),
+            ('genre=comedy&genre_match=any', ['Терминатор', 'Титаник']),
+            ('genre_contains=drama', ['Крепкий орешек', 'Титаник']),
+            ('category=films', ['Терминатор', 'Титаник']),
+            ('category=films,books',
+             ['Крепкий орешек', 'Терминатор', 'Титаник']),
+            ('category=film', []),
+            ('category_contains=ook', ['Крепкий орешек']),
+            ('category=films&genre=comedy,drama&genre_match=all', []),
+        )
+        for query, expected in cases:
+            assert self.filter_names(client, query) == expected, (
+                f'Проверьте, что фильтр `{query}` при GET-запросе к '
+                f'`{self.TITLES_URL}` возвращает {expected}.'
+            )
+
+        response = client.get(self.TITLES_URL, {'genre_match': 'some'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,290 @@
+import csv
+import os
+import shutil
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+CSV_PATH = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+def count_rows(file):
+    with open(os.path.join(CSV_PATH, file), encoding='utf-8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14CsvDb:
+
+    def test_01_batched_import(self):
+        from reviews.management.commands.csv_db import CSV_FILES_MODELS
+        from reviews.models import Title
+
+        out = StringIO()
+        call_command('csv_db', path=CSV_PATH, batch_size=7, stdout=out)
+        call_command('csv_db', path=CSV_PATH, batch_size=7, stdout=out)
+
+        for file, model in CSV_FILES_MODELS:
+            assert model.objects.count() == count_rows(file), (
+                f'Проверьте, что команда `csv_db` загружает все строки '
+                f'`{file}` при загрузке пачками.'
+            )
+            assert f'{file}: {count_rows(file)} строк' in out.getvalue()
+        assert not Title.objects.rating_drift().exists(), (
+            'Проверьте, что после `csv_db` сохраненный рейтинг произведений '
+            'соответствует отзывам.'
+        )
+
+    def test_02_upsert_import(self, tmp_path):
+        from django.core.management import CommandError
+
+        from reviews.models import Comment, Genre, Review, Title
+
+        call_command('csv_db', path=CSV_PATH, stdout=StringIO())
+        review = Review.objects.get(pk=1)
+        unchanged_review = Review.objects.get(pk=2)
+
+        shutil.copytree(CSV_PATH, tmp_path, dirs_exist_ok=True)
+        rewrites = {
+            'review.csv': lambda row: (
+                dict(row, score='1') if row['id'] == '1' else row
+            ),
+            'comments.csv': lambda row: None if row['id'] == '1' else row,
+        }
+        for file, rewrite in rewrites.items():
+            with open(CSV_PATH + f'/{file}', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                rows = [rewrite(row) for row in reader]
+                fieldnames = reader.fieldnames
+            with open(tmp_path / file, 'w', encoding='utf-8',
+                      newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(row for row in rows if row)
+        genres = (tmp_path / 'genre.csv').read_text(encoding='utf-8')
+        (tmp_path / 'genre.csv').write_text(
+            genres.rstrip('\n') + '\n100,Новый жанр,new-genre\n',
+            encoding='utf-8'
+        )
+
+        out = StringIO()
+        call_command('csv_db', path=tmp_path, upsert=True, stdout=out)
+        first_run = out.getvalue()
+        assert 'удалено' not in first_run
+        assert Comment.objects.filter(pk=1).exists(), (
+            'Проверьте, что `csv_db --upsert` без `--delete-missing` не '
+            'удаляет строки, которых нет в файлах.'
+        )
+
+        out = StringIO()
+        call_command('csv_db', path=tmp_path, upsert=True,
+                     delete_missing=True, stdout=out)
+        expected = (
+            (first_run, 'review.csv: добавлено 0, обновлено 1,'),
+            (first_run, 'genre.csv: добавлено 1, обновлено 0,'),
+            (first_run, 'titles.csv: добавлено 0, обновлено 0,'),
+            (first_run, 'users.csv: добавлено 0, обновлено 0,'),
+            (out.getvalue(), 'review.csv: добавлено 0, обновлено 0,'),
+            (out.getvalue(), 'comments.csv: удалено 1'),
+            (out.getvalue(), 'users.csv: удалено 0'),
+        )
+        for output, line in expected:
+            assert line in output, (
+                'Проверьте, что `csv_db --upsert` изменяет только '
+                f'отличающиеся строки. Не найдено: `{line}`.'
+            )
+        assert Review.objects.get(pk=1).score == 1
+        assert Review.objects.get(pk=1).pub_date == review.pub_date
+        assert Review.objects.get(pk=2).text == unchanged_review.text
+        assert not Comment.objects.filter(pk=1).exists()
+        assert Genre.objects.filter(slug='new-genre').exists()
+        assert not Title.objects.rating_drift().exists(), (
+            'Проверьте, что `csv_db --upsert` пересчитывает рейтинг '
+            'произведений с измененными отзывами.'
+        )
+
+        (tmp_path / 'comments.csv').write_text(
+            'id,review_id,text,author,pub_date\n', encoding='utf-8'
+        )
+        with pytest.raises(CommandError, match='comments.csv'):
+            call_command('csv_db', path=tmp_path, upsert=True,
+                         delete_missing=True, stdout=StringIO())
+        assert Comment.objects.exists(), (
+            'Проверьте, что пустой файл не удаляет все строки таблицы.'
+        )
+
+    def test_03_fast_import(self):
+        from django.db import connection
+
+        from reviews.management.commands.csv_db import CSV_FILES_MODELS
+        from reviews.models import Title
+        from reviews.search import search_titles
+
+        def schema():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT type, name FROM sqlite_master "
+                    "WHERE type IN ('index', 'trigger') ORDER BY name"
+                )
+                return cursor.fetchall()
+
+        def pragmas():
+            with connection.cursor() as cursor:
+                values = []
+                for pragma in ('journal_mode', 'synchronous', 'foreign_keys'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    values.append(cursor.fetchone()[0])
+                return values
+
+        schema_before, pragmas_before = schema(), pragmas()
+        out = StringIO()
+        call_command('csv_db', path=CSV_PATH, fast=True, stdout=out)
+
+        for file, model in CSV_FILES_MODELS:
+            assert model.objects.count() == count_rows(file), (
+                f'Проверьте, что `csv_db --fast` загружает все строки '
+                f'`{file}`.'
+            )
+        assert 'ANALYZE' in out.getvalue()
+        assert schema() == schema_before, (
+            'Проверьте, что `csv_db --fast` восстанавливает индексы и '
+            'триггеры после загрузки.'
+        )
+        assert pragmas() == pragmas_before, (
+            'Проверьте, что `csv_db --fast` возвращает прежние настройки '
+            'SQLite.'
+        )
+        assert not Title.objects.rating_drift().exists()
+        assert search_titles(Title.objects.all(), 'шоушенка').exists()
+
+    def test_04_parallel_import(self):
+        from django.db.models import DateTimeField
+
+        from reviews.management.commands.csv_db import CSV_FILES_MODELS
+        from reviews.models import Title, User
+
+        out = StringIO()
+        call_command('csv_db', path=CSV_PATH, batch_size=7, workers=2,
+                     stdout=out)
+
+        for file, model in CSV_FILES_MODELS:
+            assert model.objects.count() == count_rows(file), (
+                f'Проверьте, что `csv_db --workers` загружает все строки '
+                f'`{file}`.'
+            )
+            assert f'{file}: {count_rows(file)} строк' in out.getvalue()
+        assert not Title.objects.rating_drift().exists(), (
+            'Проверьте, что после `csv_db --workers` сохраненный рейтинг '
+            'произведений соответствует отзывам.'
+        )
+
+        def snapshot():
+            return {
+                model: list(model.objects.order_by('pk').values_list(*(
+                    field.attname for field in model._meta.concrete_fields
+                    if not isinstance(field, DateTimeField)
+                )))
+                for _, model in CSV_FILES_MODELS
+            }
+
+        parallel = snapshot()
+        assert User.objects.values('date_joined').distinct().count() > 1, (
+            'Проверьте, что вызываемые значения по умолчанию вычисляются '
+            'для каждой строки.'
+        )
+        call_command('csv_db', path=CSV_PATH, stdout=StringIO())
+        assert snapshot() == parallel, (
+            'Проверьте, что `csv_db --workers` загружает те же строки, что и '
+            'последовательная загрузка.'
+        )
+
+    def test_05_check_rejects_broken_files(self, tmp_path):
+        from django.core.management import CommandError
+
+        from reviews.models import Review
+
+        call_command('csv_db', path=CSV_PATH, stdout=StringIO())
+        reviews = Review.objects.count()
+
+        shutil.copytree(CSV_PATH, tmp_path, dirs_exist_ok=True)
+        with open(tmp_path / 'review.csv', 'a', encoding='utf-8') as f:
+            f.write(
+                '\n1,2,Повтор id,100,5,2020-01-13T23:20:02.422Z\n'
+                '900,1,Повтор пары,100,5,2020-01-13T23:20:02.422Z\n'
+                '901,9999,Нет произведения,100,5,2020-01-13T23:20:02.422Z\n'
+                '902,2,Нет автора,9999,5,2020-01-13T23:20:02.422Z\n'
+                '903,3,Оценка,103,11,2020-01-13T23:20:02.422Z\n'
+            )
+
+        err = StringIO()
+        with pytest.raises(CommandError) as error:
+            call_command('csv_db', path=tmp_path, stdout=StringIO(),
+                         stderr=err)
+        for kind in ('повторяющиеся id: 1',
+                     'повторяющиеся сочетания уникальных полей: 1',
+                     'ссылки на несуществующие записи: 2',
+                     'значения вне допустимого диапазона: 1'):
+            assert kind in str(error.value), (
+                'Проверьте, что `csv_db` находит в файлах ошибку вида '
+                f'`{kind}`.'
+            )
+        assert 'title_id=9999' in err.getvalue()
+
+        genres = (tmp_path / 'genre.csv').read_text(encoding='utf-8')
+        (tmp_path / 'genre.csv').write_text(
+            genres.replace('id,name,slug', 'id,name,slug_name', 1),
+            encoding='utf-8'
+        )
+        with pytest.raises(CommandError, match="genre.csv.*'slug_name'"):
+            call_command('csv_db', path=tmp_path, check=True,
+                         stdout=StringIO(), stderr=StringIO())
+        assert Review.objects.count() == reviews, (
+            'Проверьте, что `csv_db` не изменяет базу, если проверка '
+            'файлов нашла ошибки.'
+        )
+
+    def test_06_check_bounded_structures(self):
+        from reviews.management.commands.csv_db import DuplicateKeys, IdSet
+
+        keys = DuplicateKeys(chunk_size=4)
+        for key in (5, 3, 9, 3, 1, 9, 9, 2, 7, 5, 8):
+            keys.add(key)
+        assert len(keys.chunks) == 2
+        assert list(keys.duplicates()) == [3, 5, 9], (
+            'Проверьте, что повторы находятся и при слиянии кусков.'
+        )
+
+        ids = IdSet()
+        for value in (0, 7, 8, 1000, 2 ** 40, -1):
+            assert ids.add(value)
+            assert not ids.add(value)
+            assert value in ids
+        assert 9 not in ids and 2 ** 41 not in ids
+
+    def test_07_fast_import_rollback(self, tmp_path):
+        from django.core.management import CommandError
+
+        from reviews.models import Review, Title
+        from reviews.search import search_titles
+
+        call_command('csv_db', path=CSV_PATH, stdout=StringIO())
+        reviews = Review.objects.count()
+        shutil.copytree(CSV_PATH, tmp_path, dirs_exist_ok=True)
+        with open(tmp_path / 'review.csv', 'a', encoding='utf-8') as f:
+            f.write('\n901,9999,Нет произведения,100,5,'
+                    '2020-01-13T23:20:02.422Z\n')
+
+        with pytest.raises(CommandError, match='reviews_review'):
+            call_command('csv_db', path=tmp_path, fast=True,
+                         skip_check=True, stdout=StringIO())
+        assert Review.objects.count() == reviews, (
+            'Проверьте, что `csv_db --fast` откатывает загрузку, если '
+            'проверка ссылок нашла ошибки.'
+        )
+        assert search_titles(Title.objects.all(), 'шоушенка').exists(), (
+            'Проверьте, что `csv_db --fast` восстанавливает полнотекстовый '
+            'индекс после ошибки.'
+        )
+        assert not Title.objects.rating_drift().exists()
@@ -0,0 +1,139 @@
+import csv
+import json
+import os
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from tests.utils import create_reviews
+
+CSV_PATH = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15Export:
+
+    EXPORT_URL_TEMPLATE = '/api/v1/export/{dataset}/'
+
+    def test_01_export_permissions(self, client, user_client, admin_client):
+        url = self.EXPORT_URL_TEMPLATE.format(dataset='titles')
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что GET-запрос неавторизованного пользователя к '
+            f'`{url}` возвращает ответ со статусом 401.'
+        )
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что GET-запрос пользователя с ролью user к `{url}` '
+            'возвращает ответ со статусом 403.'
+        )
+        response = admin_client.get(
+            self.EXPORT_URL_TEMPLATE.format(dataset='unknown')
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_export_titles_ndjson(self, admin_client, user, user_client):
+        _, titles = create_reviews(admin_client, {user: user_client})
+
+        url = self.EXPORT_URL_TEMPLATE.format(dataset='titles')
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдается потоковым ответом.'
+        )
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        assert [record['name'] for record in records] == [
+            title['name'] for title in titles
+        ]
+        assert records[0]['genre'] == sorted(titles[0]['genre']), (
+            'Проверьте, что в выгрузке произведений перечислены слаги жанров.'
+        )
+        assert records[0]['category'] == titles[0]['category']
+        assert records[0]['rating'] == 5
+        assert records[1]['rating'] is None
+
+    def test_03_export_csv(self, admin_client, user, user_client):
+        reviews, _ = create_reviews(admin_client, {user: user_client})
+
+        url = self.EXPORT_URL_TEMPLATE.format(dataset='review')
+        response = admin_client.get(url, {'format': 'csv'})
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(StringIO(
+            b''.join(response.streaming_content).decode('utf-8')
+        )))
+        assert [int(row['id']) for row in rows] == [
+            review['id'] for review in reviews
+        ]
+        assert rows[0]['author'] == str(user.pk)
+        assert set(rows[0]) == {
+            'id', 'title_id', 'text', 'author', 'score', 'pub_date'
+        }, 'Проверьте, что столбцы выгрузки совпадают с файлами csv_db.'
+
+    def test_04_csv_round_trip(self, tmp_path):
+        from reviews.export import EXPORT_DATASETS
+        from reviews.models import Category, Review, Title
+
+        def read(path):
+            with open(path, encoding='utf-8') as f:
+                return list(csv.DictReader(f))
+
+        call_command('csv_db', path=CSV_PATH, stdout=StringIO())
+        category = Category.objects.create(name='Удаленная', slug='deleted')
+        orphan = Title.objects.create(
+            name='Без категории', year=2000, category=category,
+            description=None,
+        )
+        category.delete()
+        pub_dates = dict(Review.objects.values_list('pk', 'pub_date'))
+
+        first, second = tmp_path / 'first', tmp_path / 'second'
+        call_command('export_db', path=first, stdout=StringIO())
+        call_command('csv_db', path=first, stdout=StringIO())
+        call_command('export_db', path=second, stdout=StringIO())
+
+        for dataset in EXPORT_DATASETS:
+            file = f'{dataset}.csv'
+            exported = read(first / file)
+            source = sorted(read(os.path.join(CSV_PATH, file)),
+                            key=lambda row: int(row['id']))
+            assert [
+                {key: row[key] for key in source_row}
+                for row, source_row in zip(exported, source)
+            ] == source, (
+                f'Проверьте, что `export_db` выгружает все строки `{file}` '
+                'в формате csv_db.'
+            )
+            assert read(second / file) == exported, (
+                f'Проверьте, что выгрузка `{file}` без потерь загружается '
+                'обратно командой `csv_db`.'
+            )
+        out = StringIO()
+        call_command('csv_db', path=first, upsert=True, skip_check=True,
+                     stdout=out)
+        for dataset in EXPORT_DATASETS:
+            assert f'{dataset}.csv: добавлено 0, обновлено 0,' in (
+                out.getvalue()
+            ), (
+                f'Проверьте, что `csv_db --upsert` не находит отличий между '
+                f'базой и ее выгрузкой `{dataset}.csv`.'
+            )
+
+        orphan = Title.objects.get(pk=orphan.pk)
+        assert orphan.category_id is None and orphan.description is None, (
+            'Проверьте, что пустые значения полей с null=True загружаются '
+            'как NULL.'
+        )
+        assert dict(
+            Review.objects.values_list('pk', 'pub_date')
+        ) == pub_dates, (
+            'Проверьте, что `csv_db` сохраняет даты публикации из файла.'
+        )
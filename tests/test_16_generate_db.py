@@ -0,0 +1,73 @@
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+COUNTS = {
+    'users': 40,
+    'titles': 30,
+    'reviews': 300,
+    'comments': 200,
+    'genres': 5,
+    'genres_per_title': 2,
+}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16GenerateDb:
+
+    def reviews(self):
+        from reviews.models import Review
+
+        return list(Review.objects.order_by('pk').values_list(
+            'title_id', 'author_id', 'score', 'pub_date'
+        ))
+
+    def test_01_generate_into_database(self):
+        from reviews.models import Comment, GenreTitle, Review, Title, User
+
+        call_command('generate_db', stdout=StringIO(), **COUNTS)
+
+        assert User.objects.count() == COUNTS['users']
+        assert Title.objects.count() == COUNTS['titles']
+        assert Review.objects.count() == COUNTS['reviews'], (
+            'Проверьте, что `generate_db` создает заданное число отзывов.'
+        )
+        assert Comment.objects.count() == COUNTS['comments']
+        assert GenreTitle.objects.values('title').distinct().count() == (
+            COUNTS['titles']
+        )
+        per_title = Counter(title for title, *_ in self.reviews())
+        assert max(per_title.values()) > 3 * (
+            COUNTS['reviews'] / COUNTS['titles']
+        ), 'Проверьте, что число отзывов на произведение распределено неравно.'
+        assert not Title.objects.rating_drift().exists()
+        assert len({pub_date for *_, pub_date in self.reviews()}) > 1, (
+            'Проверьте, что даты публикации берутся из набора данных.'
+        )
+
+        reviews = self.reviews()
+        call_command('generate_db', stdout=StringIO(), **COUNTS)
+        assert self.reviews() == reviews, (
+            'Проверьте, что `generate_db` с тем же seed создает тот же набор.'
+        )
+        call_command('generate_db', seed=2, stdout=StringIO(), **COUNTS)
+        assert self.reviews() != reviews
+
+    def test_02_generate_csv_files(self, tmp_path):
+        from reviews.models import Review
+
+        call_command('generate_db', path=tmp_path, stdout=StringIO(),
+                     **COUNTS)
+        out = StringIO()
+        call_command('csv_db', path=tmp_path, stdout=out)
+        assert 'Файлы проверены' in out.getvalue(), (
+            'Проверьте, что файлы `generate_db` проходят проверку `csv_db`.'
+        )
+        assert Review.objects.count() == COUNTS['reviews']
+
+    def test_03_impossible_counts(self):
+        with pytest.raises(CommandError):
+            call_command('generate_db', users=2, titles=2, reviews=5,
+                         stdout=StringIO())
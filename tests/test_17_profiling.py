@@ -0,0 +1,78 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from tests.utils import create_reviews
+
+
+def parse_server_timing(header):
+    timings = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17Profiling:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def profiling(self, settings):
+        settings.PROFILING = {
+            'ENABLED': True, 'SLOW_REQUEST_MS': None, 'SLOWEST_QUERIES': 2,
+        }
+        return settings.PROFILING
+
+    def test_01_disabled_by_default(self, settings, client):
+        settings.PROFILING = dict(settings.PROFILING, ENABLED=False)
+        response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что без `PROFILING["ENABLED"]` заголовок '
+            '`Server-Timing` не добавляется.'
+        )
+
+    def test_02_server_timing_header(self, profiling, admin_client, user,
+                                     user_client, django_assert_num_queries):
+        create_reviews(admin_client, {user: user_client})
+        client = APIClient()
+        response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert 'Server-Timing' in response, (
+            'Проверьте, что включенное профилирование добавляет заголовок '
+            '`Server-Timing`.'
+        )
+        timings = parse_server_timing(response['Server-Timing'])
+        for name in ('db', 'serializer', 'render', 'view', 'total'):
+            assert name in timings, (
+                f'Проверьте, что `Server-Timing` содержит метрику `{name}`.'
+            )
+            assert float(timings[name]['dur']) >= 0
+        assert float(timings['total']['dur']) >= float(timings['view']['dur'])
+
+        with django_assert_num_queries(
+            int(timings['db']['desc'].strip('"').split()[0])
+        ):
+            client.get(self.TITLES_URL)
+
+    def test_03_slow_request_log(self, profiling, admin_client, caplog):
+        profiling['SLOW_REQUEST_MS'] = 0
+        with caplog.at_level(logging.WARNING, logger='api.profiling'):
+            response = admin_client.get('/api/v1/users/')
+        assert response.status_code == HTTPStatus.OK
+        messages = [
+            record.getMessage() for record in caplog.records
+            if record.name == 'api.profiling'
+        ]
+        assert len(messages) == 1, (
+            'Проверьте, что запрос дольше порога записывается в журнал.'
+        )
+        assert 'GET /api/v1/users/' in messages[0]
+        assert 'SELECT' in messages[0], (
+            'Проверьте, что в журнал попадают самые долгие SQL-запросы.'
+        )
+        assert messages[0].count(' мс  ') <= profiling['SLOWEST_QUERIES']
@@ -0,0 +1,108 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18SlowQueries:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_fingerprint(self):
+        from reviews.slow_queries import fingerprint
+
+        first = fingerprint(
+            'SELECT "reviews_title"."id" FROM "reviews_title" '
+            'WHERE "reviews_title"."year" = 2000 AND "T3"."name" = \'a\' '
+            'AND "reviews_title"."id" IN (%s, %s, %s) LIMIT 10'
+        )
+        second = fingerprint(
+            'SELECT "reviews_title"."id" FROM "reviews_title"\n'
+            'WHERE "reviews_title"."year" = 1979 AND "T3"."name" = \'b\'\'c\' '
+            'AND "reviews_title"."id" IN (%s) LIMIT 20'
+        )
+        assert first == second, (
+            'Проверьте, что отпечаток не зависит от литералов, пробелов и '
+            'длины списков IN.'
+        )
+        assert '"T3"' in first[0]
+        assert fingerprint('SELECT 1 FROM "reviews_review"') != first
+
+    def test_02_log_and_explain_once(self, admin_client, user, user_client,
+                                     client, tmp_path):
+        from reviews.slow_queries import SlowQueryLog
+
+        titles, _ = create_reviews(admin_client, {user: user_client})
+        path = tmp_path / 'slow.jsonl'
+        log = SlowQueryLog(threshold_ms=0, path=path)
+        with connection.execute_wrapper(log):
+            for _ in range(3):
+                client.get(self.TITLES_URL)
+                client.get(f'{self.TITLES_URL}{titles[0]["id"]}/reviews/')
+
+        assert log.stats, 'Проверьте, что запросы дольше порога учитываются.'
+        assert all(item['count'] == 3 for item in log.stats.values()), (
+            'Проверьте, что повторы запроса сводятся к одному отпечатку.'
+        )
+        entries = [
+            json.loads(line) for line in path.read_text().splitlines()
+        ]
+        assert len(entries) == sum(
+            item['count'] for item in log.stats.values()
+        )
+        plans = [entry['plan'] for entry in entries if entry['plan']]
+        assert len(plans) == len(log.stats), (
+            'Проверьте, что план запроса снимается один раз на отпечаток.'
+        )
+        assert any('reviews_review' in plan for plan in plans)
+
+        out = StringIO()
+        call_command('slow_queries', path=path, limit=1, order='count',
+                     stdout=out)
+        output = out.getvalue()
+        assert f'Отпечатков: {len(log.stats)}' in output
+        assert '1. [' in output and '2. [' not in output
+        assert 'План:' in output
+
+        call_command('slow_queries', path=path, clear=True, stdout=out)
+        assert path.read_text() == ''
+
+    def test_03_threshold(self, client, tmp_path):
+        from reviews.slow_queries import SlowQueryLog
+
+        path = tmp_path / 'slow.jsonl'
+        log = SlowQueryLog(threshold_ms=10000, path=path)
+        with connection.execute_wrapper(log):
+            client.get(self.TITLES_URL)
+        assert not log.stats and not path.exists(), (
+            'Проверьте, что быстрые запросы не попадают в журнал.'
+        )
+        with pytest.raises(CommandError):
+            call_command('slow_queries', path=path, stdout=StringIO())
+
+    def test_04_installed_under_scoped_wrapper(self, settings, tmp_path):
+        from reviews.slow_queries import default_log, install_slow_query_log
+
+        settings.SLOW_QUERIES = dict(
+            settings.SLOW_QUERIES, THRESHOLD_MS=0, PATH=tmp_path / 'slow.jsonl'
+        )
+
+        def scoped(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(scoped):
+            install_slow_query_log(None, connection)
+        try:
+            assert scoped not in connection.execute_wrappers
+            assert default_log() in connection.execute_wrappers, (
+                'Проверьте, что при выходе из `execute_wrapper()` снимается '
+                'его обертка, а журнал медленных запросов остается.'
+            )
+        finally:
+            connection.execute_wrappers.remove(default_log())
+            default_log.cache_clear()
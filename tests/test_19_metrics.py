@@ -0,0 +1,162 @@
+import os
+import re
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+CSV_PATH = os.path.join(settings.BASE_DIR, 'static', 'data')
+METRICS_URL = '/metrics'
+
+
+def metric_values(client):
+    """Значения метрик из ответа /metrics: {строка с метками: число}."""
+    response = client.get(METRICS_URL)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET-запрос к `{METRICS_URL}` с локального адреса '
+        'возвращает ответ со статусом 200.'
+    )
+    assert response['Content-Type'].startswith('text/plain')
+    values = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith('#'):
+            sample, value = line.rsplit(' ', 1)
+            values[sample] = float(value)
+    return values
+
+
+def delta(before, after, sample):
+    return after.get(sample, 0) - before.get(sample, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Metrics:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture(autouse=True)
+    def metrics(self, settings):
+        settings.METRICS = dict(settings.METRICS, ENABLED=True)
+        return settings.METRICS
+
+    def test_01_request_metrics(self, client):
+        before = metric_values(client)
+        for _ in range(2):
+            client.get(self.TITLES_URL)
+        client.get(f'{self.TITLES_URL}999/')
+        after = metric_values(client)
+
+        assert delta(before, after, 'yamdb_http_requests_total{route='
+                     '"titles-list",method="GET",status="200"}') == 2, (
+            'Проверьте, что запросы считаются по имени маршрута и статусу.'
+        )
+        assert delta(before, after, 'yamdb_http_requests_total{route='
+                     '"titles-detail",method="GET",status="404"}') == 1
+        assert delta(
+            before, after, 'yamdb_http_request_duration_seconds_count{'
+            'route="titles-list",method="GET"}'
+        ) == 2
+        assert delta(
+            before, after, 'yamdb_http_request_duration_seconds_bucket{'
+            'route="titles-list",method="GET",le="+Inf"}'
+        ) == 2
+        assert delta(
+            before, after, 'yamdb_http_request_db_queries_sum{'
+            'route="titles-list",method="GET"}'
+        ) >= 2, 'Проверьте, что учитывается число SQL-запросов.'
+
+    def test_02_local_only(self, client):
+        response = client.get(METRICS_URL, REMOTE_ADDR='203.0.113.5')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{METRICS_URL}` недоступен с внешних адресов.'
+        )
+
+    def test_03_cache_ratio_and_csv_import(self, client):
+        from reviews.metrics import record_cache
+
+        for hit in (True, True, True, False):
+            record_cache('test-cache', hit)
+        before = metric_values(client)
+        assert before['yamdb_cache_hit_ratio{cache="test-cache"}'] == 0.75, (
+            'Проверьте, что доля попаданий в кеш считается по счетчикам.'
+        )
+
+        call_command('csv_db', path=CSV_PATH, stdout=StringIO())
+        after = metric_values(client)
+        assert delta(before, after, 'yamdb_csv_import_rows_total'
+                     '{table="users.csv"}') > 0, (
+            'Проверьте, что `csv_db` учитывает загруженные строки.'
+        )
+        assert after[
+            'yamdb_csv_import_rows_per_second{table="users.csv"}'
+        ] > 0
+
+    def test_04_multiprocess_aggregation(self, client, settings, tmp_path):
+        from reviews.metrics import Registry
+
+        settings.METRICS = dict(settings.METRICS, MULTIPROCESS_DIR=tmp_path)
+        sample = ('yamdb_http_requests_total{route="titles-list",'
+                  'method="GET",status="200"}')
+        before = metric_values(client)
+
+        worker = Registry()
+        requests = worker.counter(
+            'yamdb_http_requests_total', 'Число запросов к API.',
+            ('route', 'method', 'status'),
+        )
+        requests.inc('titles-list', 'GET', '200', amount=5)
+        worker.flush(force=True)
+        assert (tmp_path / worker.file).exists()
+
+        client.get(self.TITLES_URL)
+        after = metric_values(client)
+        assert delta(before, after, sample) == 6, (
+            'Проверьте, что эндпоинт суммирует значения всех процессов из '
+            '`METRICS["MULTIPROCESS_DIR"]`.'
+        )
+        assert re.search(r'^# TYPE yamdb_http_requests_total counter$',
+                         client.get(METRICS_URL).content.decode(), re.M)
+
+    def test_05_dead_processes_archived(self, client, settings, tmp_path):
+        from reviews.metrics import ARCHIVE_FILE, Registry
+
+        settings.METRICS = dict(settings.METRICS, MULTIPROCESS_DIR=tmp_path)
+        sample = 'yamdb_cache_requests_total{cache="archived",result="hit"}'
+
+        worker = Registry()
+        requests = worker.counter(
+            'yamdb_cache_requests_total', 'Обращения к кешам по результату.',
+            ('cache', 'result'),
+        )
+        requests.inc('archived', 'hit', amount=3)
+        worker.flush(force=True)
+        file = worker.file
+        worker.retire()
+        assert not (tmp_path / file).exists(), (
+            'Проверьте, что при выходе процесс удаляет свой файл.'
+        )
+        assert metric_values(client)[sample] == 3
+
+        requests.inc('archived', 'hit', amount=2)
+        worker.flush(force=True)
+        (tmp_path / worker.file).rename(tmp_path / '999999999-dead.json')
+        assert metric_values(client)[sample] == 5
+        assert metric_values(client)[sample] == 5, (
+            'Проверьте, что значения завершившегося процесса учитываются '
+            'один раз.'
+        )
+        assert sorted(path.name for path in tmp_path.glob('*.json')) == [
+            ARCHIVE_FILE
+        ], (
+            'Проверьте, что файлы завершившихся процессов переносятся в '
+            'архив и удаляются.'
+        )
+
+    def test_06_disabled(self, client, settings):
+        from reviews.metrics import record_cache
+
+        settings.METRICS = dict(settings.METRICS, ENABLED=False)
+        record_cache('disabled-cache', True)
+        assert 'disabled-cache' not in client.get(METRICS_URL).content.decode()
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+
+class FlakyExecute:
+    """Выполнение запроса, падающее с заданными ошибками перед успехом."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def __call__(self, sql, params, many, context):
+        self.calls.append(sql)
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+def context(in_atomic_block=False):
+    return {'connection': SimpleNamespace(in_atomic_block=in_atomic_block)}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20SqliteTuning:
+
+    def test_01_connection_pragmas(self, settings, tmp_path):
+        from reviews.database import LockRetry, configure_sqlite
+
+        database = DatabaseWrapper(
+            dict(connection.settings_dict, NAME=str(tmp_path / 'db.sqlite3')),
+            alias='tuning',
+        )
+        connection_created.connect(configure_sqlite)
+        try:
+            with database.cursor() as cursor:
+                pragmas = {}
+                for pragma in ('journal_mode', 'busy_timeout', 'cache_size',
+                               'mmap_size', 'synchronous'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    pragmas[pragma] = cursor.fetchone()[0]
+        finally:
+            connection_created.disconnect(configure_sqlite)
+            database.close()
+
+        options = settings.SQLITE_TUNING['PRAGMAS']
+        assert pragmas['journal_mode'] == 'wal', (
+            'Проверьте, что рабочий профиль включает журнал WAL.'
+        )
+        assert pragmas['busy_timeout'] == options['busy_timeout']
+        assert pragmas['cache_size'] == options['cache_size']
+        assert pragmas['mmap_size'] == options['mmap_size']
+        assert pragmas['synchronous'] == 1
+        wrappers = [
+            wrapper for wrapper in database.execute_wrappers
+            if isinstance(wrapper, LockRetry)
+        ]
+        assert len(wrappers) == 1
+
+    def test_02_lock_retry(self):
+        from reviews.database import LockRetry
+
+        retry = LockRetry(retries=3, delay=0)
+        execute = FlakyExecute(
+            OperationalError('database is locked'),
+            OperationalError('database is locked'),
+        )
+        assert retry(execute, 'UPDATE t', (), False, context()) == 'ok', (
+            'Проверьте, что запрос вне транзакции повторяется при блокировке.'
+        )
+        assert len(execute.calls) == 3
+
+        execute = FlakyExecute(OperationalError('database is locked'))
+        assert retry(execute, 'BEGIN', None, False, context()) == 'ok'
+        assert execute.calls == ['BEGIN IMMEDIATE'] * 2, (
+            'Проверьте, что транзакции начинаются с `BEGIN IMMEDIATE`.'
+        )
+
+        execute = FlakyExecute(OperationalError('database is locked'))
+        with pytest.raises(OperationalError):
+            retry(execute, 'UPDATE t', (), False, context(True))
+        assert len(execute.calls) == 1, (
+            'Проверьте, что запросы внутри транзакции не повторяются.'
+        )
+
+        execute = FlakyExecute(OperationalError('no such table: t'))
+        with pytest.raises(OperationalError):
+            retry(execute, 'UPDATE t', (), False, context())
+        assert len(execute.calls) == 1
+
+        execute = FlakyExecute(
+            *[OperationalError('database is locked')] * 4
+        )
+        with pytest.raises(OperationalError):
+            retry(execute, 'UPDATE t', (), False, context())
+        assert len(execute.calls) == 4
@@ -0,0 +1,109 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_reviews, create_single_review
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """Реплика в файле SQLite, которую обновляет `sync_replicas`."""
+    alias = 'replica1'
+    connections.databases[alias] = dict(
+        connections['default'].settings_dict,
+        NAME=str(tmp_path / 'replica.sqlite3'),
+    )
+    settings.REPLICATION = dict(settings.REPLICATION, REPLICAS=[alias])
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+def reviews_count(client, title_id):
+    response = client.get(f'/api/v1/titles/{title_id}/reviews/')
+    assert response.status_code == HTTPStatus.OK
+    return len(response.json()['results'])
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Replicas:
+
+    def test_01_router(self, settings):
+        from reviews.models import Review
+        from reviews.replication import ReplicaRouter, Routing, current_routing
+
+        settings.REPLICATION = dict(
+            settings.REPLICATION, REPLICAS=['replica1']
+        )
+        router = ReplicaRouter()
+        assert router.db_for_read(Review) is None, (
+            'Проверьте, что вне HTTP-запроса чтение идет в основную базу.'
+        )
+        routing = Routing()
+        token = current_routing.set(routing)
+        try:
+            assert router.db_for_read(Review) is None
+            routing.use_replica()
+            assert router.db_for_read(Review) == 'replica1', (
+                'Проверьте, что безопасные запросы читают с реплики.'
+            )
+            assert router.db_for_write(Review) == 'default'
+            assert router.db_for_read(Review) is None, (
+                'Проверьте, что после записи запрос читает с основной базы.'
+            )
+        finally:
+            current_routing.reset(token)
+
+        pinned = Routing(pinned=True)
+        pinned.use_replica()
+        assert pinned.replica is None
+        assert router.allow_migrate('replica1', 'reviews') is False
+        assert router.allow_migrate('default', 'reviews') is None
+
+    def test_02_read_your_writes(self, replica, admin_client, user,
+                                 user_client, client):
+        from api.replication import PIN_COOKIE
+
+        _, titles = create_reviews(admin_client, {user: user_client})
+        call_command('sync_replicas', stdout=StringIO())
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[replica]) as copy:
+            assert reviews_count(client, titles[0]['id']) == 1
+            client.get('/api/v1/titles/')
+            client.get('/api/v1/categories/')
+        assert copy.captured_queries and not primary.captured_queries, (
+            'Проверьте, что GET-запросы к каталогу и отзывам читают с реплики.'
+        )
+
+        user_client.cookies.clear()
+        response = create_single_review(user_client, titles[1]['id'],
+                                        'Новый отзыв', 7)
+        assert response.cookies[PIN_COOKIE]['max-age'] == 5, (
+            'Проверьте, что после записи клиент закрепляется за основной '
+            'базой на `PIN_SECONDS` секунд.'
+        )
+        assert reviews_count(user_client, titles[1]['id']) == 1, (
+            'Проверьте, что клиент после записи видит свои изменения.'
+        )
+        assert reviews_count(client, titles[1]['id']) == 0
+
+        user_client.cookies.clear()
+        assert reviews_count(user_client, titles[1]['id']) == 1, (
+            'Проверьте, что пользователь после записи видит свои изменения '
+            'и без cookie закрепления.'
+        )
+
+        call_command('sync_replicas', stdout=StringIO())
+        assert reviews_count(client, titles[1]['id']) == 1, (
+            'Проверьте, что `sync_replicas` переносит изменения в реплики.'
+        )
+
+    def test_03_sync_without_replicas(self):
+        with pytest.raises(CommandError):
+            call_command('sync_replicas', stdout=StringIO())
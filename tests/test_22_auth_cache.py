@@ -0,0 +1,108 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+USERS_TABLE = '"reviews_user"'
+
+
+def user_queries(captured):
+    return [
+        query['sql'] for query in captured.captured_queries
+        if USERS_TABLE in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22AuthCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    CATEGORIES_URL = '/api/v1/categories/'
+    USERS_URL = '/api/v1/users/'
+
+    def test_01_reads_skip_user_query(self, user_client):
+        with CaptureQueriesContext(connection) as first:
+            response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(user_queries(first)) == 1
+
+        with CaptureQueriesContext(connection) as second:
+            response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert not user_queries(second), (
+            'Проверьте, что повторный запрос с тем же токеном не читает '
+            'пользователя из базы.'
+        )
+
+    def test_02_invalidation(self, admin_client, user, user_client):
+        data = {'name': 'Книги', 'slug': 'books'}
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что изменение пользователя через API сбрасывает его '
+            'запись в кеше аутентификации.'
+        )
+
+        response = user_client.patch(
+            f'{self.USERS_URL}me/', data={'username': 'renamed'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['email'] == user.email
+        response = user_client.get(f'{self.USERS_URL}me/')
+        assert response.json()['username'] == 'renamed'
+
+        response = admin_client.delete(f'{self.USERS_URL}renamed/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удаленного пользователя перестает '
+            'действовать сразу после удаления через API.'
+        )
+
+    def test_03_orm_changes(self, user, user_client):
+        data = {'name': 'Книги', 'slug': 'books'}
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        user.role = 'admin'
+        user.save()
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что сохранение пользователя вне API (админка, '
+            'shell) сбрасывает его запись в кеше аутентификации.'
+        )
+
+        user.is_active = False
+        user.save()
+        response = user_client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что отключенный пользователь теряет доступ сразу.'
+        )
+
+    def test_04_lru_cache(self):
+        from api.authentication import LRUCache
+
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None, (
+            'Проверьте, что при переполнении вытесняется давно не '
+            'использованная запись.'
+        )
+        assert cache.get('a') == 1 and cache.get('c') == 3
+
+        cache.set('d', 4, ttl=0)
+        assert cache.get('d') is None, (
+            'Проверьте, что записи с истекшим сроком не возвращаются.'
+        )
+        cache.delete('a')
+        assert cache.get('a') is None
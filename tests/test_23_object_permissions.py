@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments
+
+
+def capture(client, method, url, data=None,
+            expected_status=HTTPStatus.OK):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, data=data)
+    assert response.status_code == expected_status, (
+        f'Проверьте, что {method.upper()}-запрос к `{url}` возвращает ответ '
+        f'со статусом {expected_status}.'
+    )
+    return [query['sql'] for query in context.captured_queries]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23ObjectPermissions:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    @pytest.fixture
+    def urls(self, admin, admin_client, user, user_client):
+        """Адреса отзыва и комментария пользователя TestUser."""
+        _, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        comment = next(
+            comment for comment in
+            user_client.get(comments_url).json()['results']
+            if comment['author'] == user.username
+        )
+        return (
+            titles[0]['id'], reviews_url, reviews,
+            f'{reviews_url}{reviews[1]["id"]}/',
+            f'{comments_url}{comment["id"]}/',
+        )
+
+    def test_01_moderation_edit(self, urls, moderator_client, user_client):
+        _, _, _, review_url, comment_url = urls
+        # Первый запрос заполняет кеш аутентификации.
+        moderator_client.get(review_url)
+
+        queries = capture(moderator_client, 'patch', review_url,
+                          data={'text': 'Исправлено модератором'})
+        assert len(queries) == 2, (
+            'Проверьте, что правка текста отзыва модератором выполняет '
+            'только выборку отзыва и обновление:\n' + '\n'.join(queries)
+        )
+        assert '"reviews_user"."password"' not in queries[0], (
+            'Проверьте, что с отзывом выбирается только имя автора.'
+        )
+        assert 'SET "text"' in queries[1] and '"score"' not in queries[1], (
+            'Проверьте, что обновляются только переданные поля.'
+        )
+
+        queries = capture(moderator_client, 'patch', comment_url,
+                          data={'text': 'Исправлено модератором'})
+        assert len(queries) == 2
+
+        queries = capture(moderator_client, 'delete', comment_url,
+                          expected_status=HTTPStatus.NO_CONTENT)
+        assert len(queries) == 2
+        assert '"text"' not in queries[0] and 'reviews_user' not in queries[0]
+
+        response = user_client.patch(review_url, data={'score': 1})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['text'] == 'Исправлено модератором'
+
+    def test_02_author_and_stranger(self, urls, user_client, admin_client,
+                                    moderator_client):
+        title_id, reviews_url, reviews, review_url, _ = urls
+        moderator_client.get(review_url)
+
+        response = user_client.patch(
+            f'{reviews_url}{reviews[0]["id"]}/', data={'text': 'Чужой'}
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что пользователь не может изменить чужой отзыв.'
+        )
+
+        response = user_client.patch(review_url, data={'score': 1})
+        assert response.status_code == HTTPStatus.OK
+        title_url = f'/api/v1/titles/{title_id}/'
+        assert admin_client.get(title_url).json()['rating'] == 3, (
+            'Проверьте, что изменение оценки автором пересчитывает рейтинг.'
+        )
+
+        queries = capture(moderator_client, 'delete', review_url,
+                          expected_status=HTTPStatus.NO_CONTENT)
+        assert '"text"' not in queries[0] and 'reviews_user' not in queries[0]
+        assert admin_client.get(title_url).json()['rating'] == 5
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class FlakyBackend(EmailBackend):
+    """Почтовый бэкенд, отклоняющий адреса с `fail` и считающий соединения."""
+
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any('fail' in address for address in message.to):
+                raise ConnectionError('Сервер отклонил письмо')
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24Outbox:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def test_01_signup_enqueues(self, client):
+        from reviews.models import OutgoingEmail
+
+        response = client.post(
+            self.URL_SIGNUP,
+            data={'email': 'queued@yamdb.fake', 'username': 'queued'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert not mail.outbox, (
+            'Проверьте, что регистрация не ждет отправки письма.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == 'queued@yamdb.fake'
+        assert 'confirmation code' in email.message
+
+        out = StringIO()
+        call_command('send_emails', stdout=out)
+        assert 'Отправлено писем: 1, ошибок: 0' in out.getvalue()
+        assert [message.to for message in mail.outbox] == [
+            ['queued@yamdb.fake']
+        ]
+        assert not OutgoingEmail.objects.exists(), (
+            'Проверьте, что отправленные письма удаляются из очереди.'
+        )
+
+    def test_02_retries(self, settings):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import deliver_batch, enqueue_email
+
+        settings.EMAIL_BACKEND = 'tests.test_24_outbox.FlakyBackend'
+        settings.EMAIL_OUTBOX = dict(settings.EMAIL_OUTBOX, MAX_ATTEMPTS=2)
+        for number in range(5):
+            enqueue_email('Тема', 'Текст', f'user{number}@yamdb.fake')
+        enqueue_email('Тема', 'Текст', 'fail@yamdb.fake')
+
+        FlakyBackend.opened = 0
+        assert deliver_batch(batch_size=4) == (4, 0)
+        assert FlakyBackend.opened == 1, (
+            'Проверьте, что пачка писем отправляется через одно соединение.'
+        )
+        started = timezone.now()
+        assert deliver_batch(batch_size=4) == (1, 1)
+        assert len(mail.outbox) == 5
+
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1 and not email.failed
+        assert email.last_error == 'ConnectionError: Сервер отклонил письмо'
+        assert email.next_attempt >= started + timedelta(
+            seconds=settings.EMAIL_OUTBOX['RETRY_DELAY']
+        ), 'Проверьте, что повторная попытка откладывается.'
+        assert deliver_batch() == (0, 0)
+
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        assert deliver_batch() == (0, 1)
+        email.refresh_from_db()
+        assert email.attempts == 2 and email.failed, (
+            'Проверьте, что после MAX_ATTEMPTS попыток письмо помечается '
+            'недоставленным.'
+        )
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        assert deliver_batch() == (0, 0)
+
+    def test_03_expired_lease(self):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import claim_batch, deliver_batch, enqueue_email
+
+        enqueue_email('Тема', 'Текст', 'lease@yamdb.fake')
+        assert len(claim_batch(10)) == 1
+        assert deliver_batch() == (0, 0), (
+            'Проверьте, что захваченные письма недоступны другим '
+            'отправителям.'
+        )
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        assert deliver_batch() == (1, 0), (
+            'Проверьте, что письма упавшего отправителя отправляются после '
+            'окончания аренды.'
+        )
@@ -0,0 +1,59 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25UserCreate:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    def test_01_single_insert(self, client):
+        from reviews.models import User
+
+        with CaptureQueriesContext(connection) as context:
+            User.objects.create(username='single', email='single@yamdb.fake')
+        queries = [query['sql'] for query in context.captured_queries]
+        assert len(queries) == 1 and queries[0].startswith('INSERT'), (
+            'Проверьте, что создание пользователя выполняет одну вставку '
+            'без повторного сохранения:\n' + '\n'.join(queries)
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                self.URL_SIGNUP,
+                data={'email': 'signup@yamdb.fake', 'username': 'signup'}
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert not any(
+            query['sql'].startswith('UPDATE "reviews_user"')
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что регистрация не обновляет только что созданного '
+            'пользователя.'
+        )
+
+    def test_02_bulk_created_code(self, client):
+        from reviews.models import User
+
+        User.objects.bulk_create(
+            User(username=f'bulk{number}', email=f'bulk{number}@yamdb.fake')
+            for number in range(3)
+        )
+        user = User.objects.get(username='bulk1')
+        assert default_token_generator.check_token(
+            user, user.confirmation_code
+        ), (
+            'Проверьте, что у пользователей, созданных через bulk_create, '
+            'есть действующий код подтверждения.'
+        )
+        response = client.post(self.URL_TOKEN, data={
+            'username': user.username,
+            'confirmation_code': user.confirmation_code,
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert 'token' in response.json()
@@ -1,5 +1,9 @@
+import re
 from http import HTTPStatus
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +309,53 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+def check_max_queries(client, method, url, max_queries, data=None,
+                      expected_status=HTTPStatus.OK):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, data=data)
+    assert response.status_code == expected_status, (
+        f'Проверьте, что {method.upper()}-запрос к `{url}` возвращает ответ '
+        f'со статусом {expected_status}.'
+    )
+    queries = '\n'.join(query['sql'] for query in context.captured_queries)
+    assert len(context.captured_queries) <= max_queries, (
+        f'{method.upper()}-запрос к `{url}` выполнил '
+        f'{len(context.captured_queries)} запросов к базе данных, '
+        f'допустимо не больше {max_queries}:\n{queries}'
+    )
+    return response
+
+
+def explain_query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def check_query_plan(client, url, table, index, sorted_by_index=True):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает ответ со статусом '
+        '200.'
+    )
+    queries = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and f'FROM "{table}"' in query['sql']
+        and 'COUNT(*)' not in query['sql']
+    ]
+    assert queries, f'GET-запрос к `{url}` не читает таблицу `{table}`.'
+    for sql in queries:
+        plan = explain_query_plan(sql)
+        assert re.search(rf'INDEX {index}\b', plan), (
+            f'Запрос к `{table}` при GET-запросе к `{url}` не использует '
+            f'индекс `{index}`:\n{sql}\n{plan}'
+        )
+        if sorted_by_index:
+            assert 'TEMP B-TREE' not in plan, (
+                f'Запрос к `{table}` при GET-запросе к `{url}` сортирует '
+                f'записи без индекса:\n{sql}\n{plan}'
+            )